@@ -1,10 +1,19 @@
 from pathlib import Path
 import json
+import os
+import tempfile
 import numpy as np
 import pandas as pd
-import joblib
 import streamlit as st
 
+import profiling
+from drift import DEFAULT_THRESHOLD, DriftMonitor
+from pred_cache import PredictionCache
+from profiling import span
+from registry import METRICS_FILE, active_version, artifact_path, default_model_path, is_registry, model_token
+from scoring import iter_frame_features, predictions_frame, score_batch
+from scoring import load_bundle as scoring_load_bundle
+
 
 st.set_page_config(
     page_title="Iris Classifier — GaussianNB",
@@ -13,24 +22,36 @@ st.set_page_config(
 )
 
 
+def _file_version(path: Path):
+    """(mtime_ns, tamanho): muda sempre que o arquivo é regravado."""
+    st_ = path.stat()
+    return st_.st_mtime_ns, st_.st_size
+
+# Cache por processo: a chave inclui a versão (ativa no registro, ou mtime/tamanho
+# do .joblib avulso), então uma nova promoção invalida a entrada e max_entries=1
+# descarta o bundle antigo.
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_bundle_cached(model_path: str, version):
+    # feature_columns: ordem das colunas usada no treino
+    return scoring_load_bundle(Path(model_path))
+
+@st.cache_data(max_entries=1, show_spinner=False)
+def _load_metrics_cached(metrics_path: str, version):
+    try:
+        return json.loads(Path(metrics_path).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
 def load_bundle(model_path: Path):
     if not model_path.exists():
         st.error(f"Modelo não encontrado: {model_path}\nRode antes: `python src/train.py`.")
         st.stop()
-    bundle = joblib.load(model_path)
-    clf = bundle["model"]
-    feature_columns = bundle["feature_columns"]         # ordem das colunas usada no treino
-    species_to_int = bundle["species_to_int"]
-    int_to_species = bundle["int_to_species"]
-    return clf, feature_columns, species_to_int, int_to_species
+    return _load_bundle_cached(str(model_path), model_token(model_path))
 
 def load_metrics(metrics_path: Path):
     if not metrics_path.exists():
         return None
-    try:
-        return json.loads(metrics_path.read_text(encoding="utf-8"))
-    except Exception:
-        return None
+    return _load_metrics_cached(str(metrics_path), _file_version(metrics_path))
 
 def base_feature_key(name: str) -> str:
     """Normaliza o nome salvo no modelo para uma chave base (sem _cm etc)."""
@@ -47,119 +68,261 @@ def parse_float(text: str):
     except Exception:
         return False, "Digite um número válido (use ponto ou vírgula)."
 
+BATCH_CHUNK_ROWS = 50_000
 
-ROOT = Path(__file__).resolve().parents[1]
-MODEL_PATH = ROOT / "models" / "iris_nb.joblib"
-METRICS_PATH = ROOT / "models" / "metrics.json"
-
-clf, feature_columns, species_to_int, int_to_species = load_bundle(MODEL_PATH)
-metrics = load_metrics(METRICS_PATH)
-
-
-classes_in_model = getattr(clf, "classes_", np.array(sorted(int_to_species.keys())))
-class_names = [int_to_species[int(c)] for c in classes_in_model]
-
-
-with st.sidebar:
-    st.header("ℹ️ Sobre o modelo")
-    st.write("**Algoritmo:** Gaussian Naive Bayes")
-    if metrics:
-        st.metric(label="Accuracy (test)", value=f"{metrics.get('accuracy', 0):.4f}")
-        st.caption(
-            f"Split: test_size={metrics.get('test_size')} | shuffle={metrics.get('shuffle')} | "
-            f"random_state={metrics.get('random_state')}"
-        )
-    st.write("**Ordem das features no modelo:**")
-    st.code(", ".join(feature_columns), language="text")
-    st.write("**Mapa de rótulos:**")
-    st.code(json.dumps(species_to_int, indent=2, ensure_ascii=False), language="json")
-    st.write("**Caminhos:**")
-    st.code(str(MODEL_PATH), language="text")
-    st.code(str(METRICS_PATH), language="text")
-
-st.title("🌸 Iris Classifier")
-st.caption("Interface web para predição — GaussianNB (Iris)")
-
-
-defaults = {
-    "sepal_length": "5.1",
-    "sepal_width":  "3.5",
-    "petal_length": "1.4",
-    "petal_width":  "0.2",
-}
-
-with st.form("predict_form", clear_on_submit=False):
-    st.write("**Digite os valores (aceita vírgula ou ponto):**")
-    col1, col2 = st.columns(2)
-    with col1:
-        sepal_length_txt = st.text_input("Sepal Length (cm)", value=defaults["sepal_length"])
-        petal_length_txt = st.text_input("Petal Length (cm)", value=defaults["petal_length"])
-    with col2:
-        sepal_width_txt  = st.text_input("Sepal Width (cm)",  value=defaults["sepal_width"])
-        petal_width_txt  = st.text_input("Petal Width (cm)",  value=defaults["petal_width"])
-
-    submitted = st.form_submit_button("🔮 Prever (Enter)")
-
-
-if submitted:
-    fields = {
-        "sepal_length": sepal_length_txt,
-        "sepal_width":  sepal_width_txt,
-        "petal_length": petal_length_txt,
-        "petal_width":  petal_width_txt,
-    }
-
-    ui_values = {}
-    errors = []
-    for k, txt in fields.items():
-        ok, val = parse_float(txt)
-        if not ok:
-            errors.append(f"**{k.replace('_',' ').title()}**: {val}")
-        else:
-            ui_values[k] = float(val)
-
-    if errors:
-        st.error("Erros na entrada:\n\n- " + "\n- ".join(errors))
-        st.stop()
+def score_upload(uploaded, clf, feature_columns, int_to_species, chunksize=BATCH_CHUNK_ROWS, cache=None,
+                 monitor=None):
+    """Pontua o CSV enviado em chunks (um predict_proba por chunk) com barra de progresso.
+
+    O CSV de saída vai para um arquivo temporário (devolvido como caminho); em
+    memória ficam só o chunk atual e a prévia.
+    """
+    classes = np.asarray(clf.classes_)
+    total_bytes = max(int(uploaded.size), 1)
+    counts = np.zeros(len(classes), dtype=np.int64)
+    preview = None
+    n_rows = 0
+
+    bar = st.progress(0.0, text="Pontuando...")
+    uploaded.seek(0)
+    frames = pd.read_csv(uploaded, chunksize=chunksize)
+    out_file = tempfile.NamedTemporaryFile("w", prefix="iris_predictions-", suffix=".csv", newline="",
+                                           encoding="utf-8", delete=False)
+    try:
+        with out_file:
+            for df, X in iter_frame_features(frames, feature_columns):
+                with span("predict", rows=len(df)):
+                    labels, proba = score_batch(clf, X, cache=cache)
+                if monitor is not None:
+                    monitor.update(X, labels)
+                with span("render", rows=len(df)):
+                    out = predictions_frame(labels, proba, classes, int_to_species)
+                    out.index = df.index
+                    result = pd.concat([df, out], axis=1)
+                    result.to_csv(out_file, header=(n_rows == 0), index=False)
+                if preview is None:
+                    preview = result.head(20)
+                counts += np.bincount(np.searchsorted(classes, labels), minlength=len(classes))
+                n_rows += len(df)
+                bar.progress(min(uploaded.tell() / total_bytes, 1.0), text=f"{n_rows:,} linhas pontuadas")
+    except BaseException:
+        os.unlink(out_file.name)
+        raise
+    bar.progress(1.0, text=f"Concluído: {n_rows:,} linhas")
+
+    summary = pd.DataFrame({
+        "espécie": [int_to_species[int(c)] for c in classes],
+        "linhas": counts,
+    }).set_index("espécie")
+    return out_file.name, preview, summary, n_rows
+
+def render_batch_tab(clf, feature_columns, int_to_species, cache=None, monitor=None):
+    st.write("**Envie um CSV com as 4 features** (cabeçalhos como no treino; sinônimos são aceitos).")
+    uploaded = st.file_uploader("Arquivo CSV", type=["csv"], key="batch_upload")
+    if uploaded is None:
+        return
+
+    # o resultado fica na sessão (o CSV, só o caminho do temporário): o clique em "Baixar" causa um rerun
+    state_key = (uploaded.file_id, uploaded.size)
+    if st.button("📊 Pontuar arquivo", key="batch_run"):
+        _discard_batch_result()
+        try:
+            st.session_state["batch_result"] = (state_key, *score_upload(uploaded, clf, feature_columns, int_to_species,
+                                                                         cache=cache, monitor=monitor))
+            if monitor is not None:
+                monitor.flush()
+        except (KeyError, ValueError) as exc:
+            st.error(f"Não foi possível pontuar o arquivo: {exc}")
+            return
+
+    cached = st.session_state.get("batch_result")
+    if not cached or cached[0] != state_key:
+        return
+    _, csv_path, preview, summary, n_rows = cached
+    if not Path(csv_path).exists():  # temporário removido (ex.: limpeza do /tmp)
+        _discard_batch_result()
+        st.warning("O resultado expirou; pontue o arquivo de novo.")
+        return
+    st.success(f"{n_rows:,} linhas pontuadas.")
+    st.subheader("Distribuição das predições")
+    st.bar_chart(summary)
+    with st.expander("Prévia (primeiras 20 linhas)"):
+        st.dataframe(preview, width="stretch")
+    # lido do disco só no clique (download adiado), não a cada rerun
+    st.download_button("⬇️ Baixar predições (CSV)", data=Path(csv_path).read_bytes, file_name="iris_predictions.csv",
+                       mime="text/csv", key="batch_download")
+
+
+def _discard_batch_result():
+    """Apaga o CSV temporário do resultado anterior desta sessão."""
+    cached = st.session_state.pop("batch_result", None)
+    if cached:
+        Path(cached[1]).unlink(missing_ok=True)
+
+# Cache de predições (opt-in): compartilhado entre sessões do mesmo processo
+@st.cache_resource(show_spinner=False)
+def get_prediction_cache(maxsize: int, decimals: int):
+    return PredictionCache(maxsize=maxsize, decimals=decimals)
+
+# Monitor de drift (opt-in, IRIS_DRIFT_PATH): um por processo, somando todas as sessões
+@st.cache_resource(show_spinner=False)
+def get_drift_monitor(path: str, threshold: float):
+    return DriftMonitor(path, threshold=threshold)
+
+MODEL_PATH = default_model_path()  # registro (segue a versão ativa) ou o .joblib avulso
+METRICS_PATH = artifact_path(MODEL_PATH, METRICS_FILE)
+
+# Instrumentação (IRIS_PROFILE=1): um trace por execução do script. O finally grava
+# também as execuções interrompidas por st.stop() ou por um rerun (StopException/
+# RerunException passam por aqui).
+_tracer = profiling.start("streamlit", thread_local=True)
+try:
+    with span("load_bundle"):
+        clf, feature_columns, species_to_int, int_to_species = load_bundle(MODEL_PATH)
+        metrics = load_metrics(METRICS_PATH)
+
+    PRED_CACHE_SIZE = int(os.environ.get("IRIS_PREDICT_CACHE_SIZE", "0"))
+    pred_cache = None
+    if PRED_CACHE_SIZE > 0:
+        pred_cache = get_prediction_cache(PRED_CACHE_SIZE, int(os.environ.get("IRIS_PREDICT_CACHE_DECIMALS", "1")))
+        pred_cache.bind(model_token(MODEL_PATH))  # nova versão invalida o cache
+
+    DRIFT_PATH = os.environ.get("IRIS_DRIFT_PATH")
+    drift_monitor = None
+    if DRIFT_PATH:
+        drift_monitor = get_drift_monitor(DRIFT_PATH, float(os.environ.get("IRIS_DRIFT_THRESHOLD", DEFAULT_THRESHOLD)))
+        drift_monitor.bind(model_token(MODEL_PATH), clf, feature_columns, int_to_species)  # nova versão recomeça
+
+
+    classes_in_model = getattr(clf, "classes_", np.array(sorted(int_to_species.keys())))
+    class_names = [int_to_species[int(c)] for c in classes_in_model]
+
+
+    with st.sidebar:
+        st.header("ℹ️ Sobre o modelo")
+        st.write("**Algoritmo:** Gaussian Naive Bayes")
+        if metrics:
+            st.metric(label="Accuracy (test)", value=f"{metrics.get('accuracy', 0):.4f}")
+            st.caption(
+                f"Split: test_size={metrics.get('test_size')} | shuffle={metrics.get('shuffle')} | "
+                f"random_state={metrics.get('random_state')}"
+            )
+        st.write("**Ordem das features no modelo:**")
+        st.code(", ".join(feature_columns), language="text")
+        st.write("**Mapa de rótulos:**")
+        st.code(json.dumps(species_to_int, indent=2, ensure_ascii=False), language="json")
+        st.write("**Caminhos:**")
+        st.code(str(MODEL_PATH), language="text")
+        st.code(str(METRICS_PATH), language="text")
+        if is_registry(MODEL_PATH):
+            st.caption(f"Versão ativa: {active_version(MODEL_PATH)}")
+        if drift_monitor is not None:
+            drift_summary = drift_monitor.snapshot()
+            st.write("**Drift das entradas:**")
+            if drift_summary["drift"]:
+                st.warning("\n".join(f"- {a}" for a in drift_summary["alerts"][:5]))
+            else:
+                st.caption(f"Sem drift em {drift_summary['rows']:,} linhas (resumo em {DRIFT_PATH}).")
+
+    st.title("🌸 Iris Classifier")
+    st.caption("Interface web para predição — GaussianNB (Iris)")
+
+
+    tab_single, tab_batch = st.tabs(["🔮 Predição individual", "📄 Lote (CSV)"])
+
+    # A aba de lote é desenhada antes: o fluxo individual usa st.stop() em erros de entrada.
+    with tab_batch:
+        render_batch_tab(clf, feature_columns, int_to_species, cache=pred_cache, monitor=drift_monitor)
+
+    with tab_single:
+        defaults = {
+            "sepal_length": "5.1",
+            "sepal_width":  "3.5",
+            "petal_length": "1.4",
+            "petal_width":  "0.2",
+        }
+
+        with st.form("predict_form", clear_on_submit=False):
+            st.write("**Digite os valores (aceita vírgula ou ponto):**")
+            col1, col2 = st.columns(2)
+            with col1:
+                sepal_length_txt = st.text_input("Sepal Length (cm)", value=defaults["sepal_length"])
+                petal_length_txt = st.text_input("Petal Length (cm)", value=defaults["petal_length"])
+            with col2:
+                sepal_width_txt  = st.text_input("Sepal Width (cm)",  value=defaults["sepal_width"])
+                petal_width_txt  = st.text_input("Petal Width (cm)",  value=defaults["petal_width"])
+
+            submitted = st.form_submit_button("🔮 Prever (Enter)")
+
+
+        if submitted:
+            fields = {
+                "sepal_length": sepal_length_txt,
+                "sepal_width":  sepal_width_txt,
+                "petal_length": petal_length_txt,
+                "petal_width":  petal_width_txt,
+            }
+
+            ui_values = {}
+            errors = []
+            with span("parse"):
+                for k, txt in fields.items():
+                    ok, val = parse_float(txt)
+                    if not ok:
+                        errors.append(f"**{k.replace('_',' ').title()}**: {val}")
+                    else:
+                        ui_values[k] = float(val)
+
+            if errors:
+                st.error("Erros na entrada:\n\n- " + "\n- ".join(errors))
+                st.stop()
+
+
+            ordered_vals = []
+            for col in feature_columns:
+                base_key = base_feature_key(col)   
+                if base_key not in ui_values:
+                    st.error(f"Entrada ausente para a feature '{col}'.")
+                    st.stop()
+                ordered_vals.append(ui_values[base_key])
+
+
+            X = np.array(ordered_vals, dtype=float).reshape(1, -1)
+            with span("predict"):
+                labels, proba_all = score_batch(clf, X, cache=pred_cache)  # um predict_proba só
+            if drift_monitor is not None:
+                drift_monitor.update(X, labels)
+            y_pred = int(labels[0])
+            species = int_to_species[y_pred]
+
+            st.success(f"**Predição:** {species.upper()}  —  (label = {y_pred})")
+
+
+            df_inputs = pd.DataFrame([ordered_vals], columns=feature_columns)
+            with st.expander("Ver entradas usadas na predição"):
+                st.dataframe(df_inputs, width="stretch")
+
+
+            if hasattr(clf, "predict_proba"):
+                proba = proba_all[0]
+                df_prob = pd.DataFrame({"classe": classes_in_model, "espécie": class_names, "probabilidade": proba})
+                df_prob = df_prob.set_index("espécie")[["probabilidade"]]
+                st.subheader("Probabilidade por classe")
+                st.bar_chart(df_prob)
 
-    
-    ordered_vals = []
-    for col in feature_columns:
-        base_key = base_feature_key(col)   
-        if base_key not in ui_values:
-            st.error(f"Entrada ausente para a feature '{col}'.")
-            st.stop()
-        ordered_vals.append(ui_values[base_key])
-
-   
-    X = np.array(ordered_vals, dtype=float).reshape(1, -1)
-    y_pred = int(clf.predict(X)[0])
-    species = int_to_species[y_pred]
-
-    st.success(f"**Predição:** {species.upper()}  —  (label = {y_pred})")
-
-   
-    df_inputs = pd.DataFrame([ordered_vals], columns=feature_columns)
-    with st.expander("Ver entradas usadas na predição"):
-        st.dataframe(df_inputs, use_container_width=True)
-
-  
-    if hasattr(clf, "predict_proba"):
-        proba = clf.predict_proba(X)[0]
-        df_prob = pd.DataFrame({"classe": classes_in_model, "espécie": class_names, "probabilidade": proba})
-        df_prob = df_prob.set_index("espécie")[["probabilidade"]]
-        st.subheader("Probabilidade por classe")
-        st.bar_chart(df_prob)
-
-    
-    result_json = json.dumps({
-        "input_order": feature_columns,
-        "input_values": ordered_vals,
-        "pred_label": y_pred,
-        "pred_species": species,
-    }, ensure_ascii=False, indent=2)
-    st.download_button("⬇️ Baixar resultado (JSON)", data=result_json, file_name="iris_prediction.json", mime="application/json")
 
+            result = {
+                "input_order": feature_columns,
+                "input_values": ordered_vals,
+                "pred_label": y_pred,
+                "pred_species": species,
+            }
+            if pred_cache is not None:
+                result["cache"] = pred_cache.stats()
+            result_json = json.dumps(result, ensure_ascii=False, indent=2)
+            st.download_button("⬇️ Baixar resultado (JSON)", data=result_json, file_name="iris_prediction.json", mime="application/json")
+finally:
+    profiling.stop(_tracer)
 
 st.divider()
 st.caption("Dica rápida: *petal_length* < ~2.5 → setosa; 3–5 (e *petal_width* ≤ ~1.8) → versicolor; > ~5 ou *petal_width* > ~1.8 → virginica.")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# Benchmark dos caminhos quentes de treino e inferência (tempo e pico de memória)
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import GaussianNB
+
+from data_cache import load_typed_csv
+from train import fit_float32, index_split, predict_rows
+from utils import (
+    SPECIES_TO_INT,
+    INT_TO_SPECIES,
+    encode_species,
+    find_species_column,
+    normalize_species_name,
+    resolve_feature_columns,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def reference_model(csv_path: Path):
+    """GaussianNB ajustado no iris.csv: fonte das gaussianas usadas na amostragem."""
+    df = pd.read_csv(csv_path)
+    cols = resolve_feature_columns(df)
+    y = encode_species(df[find_species_column(df.columns)]).to_numpy(dtype=int)
+    return GaussianNB().fit(df[cols].to_numpy(dtype=float), y), cols
+
+
+def synthetic_frame(clf, cols, n_rows, seed=0):
+    """Dataset no formato do iris.csv amostrado das gaussianas por classe do modelo."""
+    rng = np.random.default_rng(seed)
+    cls_idx = rng.choice(len(clf.classes_), size=n_rows, p=clf.class_prior_)
+    X = rng.normal(clf.theta_[cls_idx], np.sqrt(clf.var_[cls_idx]))
+    # rótulos crus como no CSV original ("Iris-setosa"), para exercitar a normalização
+    raw_names = np.array([f"Iris-{INT_TO_SPECIES[int(c)]}" for c in clf.classes_])
+    df = pd.DataFrame(np.round(X, 1), columns=cols)
+    df["species"] = raw_names[cls_idx]
+    return df
+
+
+def measure(fn, memory=True):
+    """Executa fn e devolve (resultado, métricas). Memória via tracemalloc num 2º passe,
+    para não distorcer o tempo."""
+    t0 = time.perf_counter()
+    result = fn()
+    stats = {"seconds": time.perf_counter() - t0}
+    if memory:
+        del result
+        tracemalloc.start()
+        try:
+            result = fn()
+            stats["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result, stats
+
+
+def bench_float32(csv_path: Path, cache_dir: Path, memory=True):
+    """Treino 80/20 a partir do loader tipado: train.py padrão (float64) x train.py --float32.
+
+    Cada caminho começa do DataFrame no seu dtype (memory-map do cache) e rótulos já
+    codificados; a diferença de pico é só das cópias de X e do split.
+    """
+    df, _ = load_typed_csv(csv_path, cache_dir)
+    df64, _ = load_typed_csv(csv_path, cache_dir, dtype=np.float64)
+    cols = resolve_feature_columns(df)
+    y = encode_species(df[find_species_column(df.columns)]).to_numpy(dtype=int)
+
+    def float64_path():
+        X = df64[cols].to_numpy(dtype=np.float64)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=True, random_state=42)
+        clf = GaussianNB().fit(X_train, y_train)
+        return clf, y_test, clf.predict(X_test)
+
+    def float32_path():
+        X = df[cols].to_numpy(dtype=np.float32)
+        train_idx, test_idx = index_split(len(y))
+        clf = fit_float32(X, y, train_idx)
+        return clf, y[test_idx], predict_rows(clf, X, test_idx)
+
+    (clf64, y_test64, pred64), s64 = measure(float64_path, memory)
+    (clf32, y_test32, pred32), s32 = measure(float32_path, memory)
+    s64["accuracy"] = float(np.mean(y_test64 == pred64))
+    s32["accuracy"] = float(np.mean(y_test32 == pred32))
+    s32["accuracy_equal"] = s32["accuracy"] == s64["accuracy"]
+    s32["max_abs_diff_theta"] = float(np.max(np.abs(clf32.theta_ - clf64.theta_)))
+    s32["max_abs_diff_var"] = float(np.max(np.abs(clf32.var_ - clf64.var_)))
+    if memory and s64["peak_mb"] > 0:
+        s32["peak_saving_pct"] = 100.0 * (1.0 - s32["peak_mb"] / s64["peak_mb"])
+    return s64, s32
+
+
+def bench_size(clf_ref, cols, n_rows, workdir: Path, memory=True, single_repeats=2000):
+    df = synthetic_frame(clf_ref, cols, n_rows)
+    csv_path = workdir / f"synthetic_{n_rows}.csv"
+    df.to_csv(csv_path, index=False)
+    del df
+
+    stages = {}
+    df, stages["csv_parse"] = measure(lambda: pd.read_csv(csv_path), memory)
+    # loader tipado: 1ª chamada faz parse + grava o cache; a 2ª só abre os .npy via mmap
+    cache_dir = workdir / "cache"
+    _, stages["typed_load_cold"] = measure(lambda: load_typed_csv(csv_path, cache_dir), memory=False)
+    _, stages["typed_load_cached"] = measure(lambda: load_typed_csv(csv_path, cache_dir), memory)
+    species, stages["normalize_species"] = measure(
+        lambda: df["species"].map(normalize_species_name), memory
+    )
+    labels, stages["replace_mapping"] = measure(
+        lambda: species.replace(SPECIES_TO_INT).infer_objects(copy=False).astype("int64"), memory
+    )
+    # caminho vetorizado (normaliza só as categorias): deve gerar os mesmos rótulos
+    encoded, stages["encode_species"] = measure(lambda: encode_species(df["species"]), memory)
+    stages["encode_species"]["labels_match"] = bool(encoded.equals(labels))
+    stages["encode_species"]["speedup_vs_rowwise"] = (
+        (stages["normalize_species"]["seconds"] + stages["replace_mapping"]["seconds"])
+        / stages["encode_species"]["seconds"]
+    )
+    X = df[cols].to_numpy(dtype=float)
+    y = labels.to_numpy(dtype=int)
+    clf, stages["fit"] = measure(lambda: GaussianNB().fit(X, y), memory)
+
+    row = X[:1].copy()
+    lat = np.empty(single_repeats)
+    for i in range(single_repeats):
+        t0 = time.perf_counter()
+        clf.predict(row)
+        clf.predict_proba(row)
+        lat[i] = time.perf_counter() - t0
+    stages["predict_single"] = {
+        "p50_us": float(np.percentile(lat, 50) * 1e6),
+        "p99_us": float(np.percentile(lat, 99) * 1e6),
+        "repeats": single_repeats,
+    }
+    _, stages["predict_batch"] = measure(lambda: clf.predict_proba(X), memory)
+    stages["train_float64"], stages["train_float32"] = bench_float32(csv_path, cache_dir, memory)
+
+    for name in ("csv_parse", "typed_load_cold", "typed_load_cached", "normalize_species", "replace_mapping",
+                 "encode_species", "fit", "predict_batch", "train_float64", "train_float32"):
+        secs = stages[name]["seconds"]
+        stages[name]["rows_per_sec"] = n_rows / secs if secs > 0 else None
+    csv_path.unlink()
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return {"rows": n_rows, "stages": stages}
+
+
+def bench_cli_startup(repeats=5, model=None):
+    """Tempo de parede de `predict_pretty.py --plain` (imports + carga + predição).
+
+    Com --no-daemon: um daemon rodando na máquina responderia no lugar da CLI e
+    o benchmark mediria só o round-trip do socket.
+    """
+    cmd = [sys.executable, str(ROOT / "src" / "predict_pretty.py"), "--plain", "--timing", "--no-daemon",
+           "--values", "5.1,3.5,1.4,0.2"]
+    if model:
+        cmd += ["--model", str(model)]
+    wall, inner = [], []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        wall.append((time.perf_counter() - t0) * 1000.0)
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "falhou"}
+        inner.append(json.loads(proc.stdout)["timing_ms"])
+    return {
+        "wall_ms": float(np.median(wall)),
+        "imports_ms": float(np.median([t["imports"] for t in inner])),
+        "load_model_ms": float(np.median([t["load_model"] for t in inner])),
+        "model_backend": inner[-1]["model_backend"],
+        "repeats": repeats,
+    }
+
+
+def run_metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Lista os estágios cujo tempo piorou mais que threshold (ex.: 0.2 = +20%)."""
+    base = {r["rows"]: r["stages"] for r in baseline.get("results", [])}
+    regressions = []
+    cur_cli, old_cli = current.get("cli_startup") or {}, baseline.get("cli_startup") or {}
+    if cur_cli.get("wall_ms") and old_cli.get("wall_ms"):
+        ratio = cur_cli["wall_ms"] / old_cli["wall_ms"]
+        if ratio > 1.0 + threshold:
+            regressions.append({"rows": 1, "stage": "cli_startup", "ratio": ratio})
+    for res in current["results"]:
+        old = base.get(res["rows"])
+        if not old:
+            continue
+        for name, st in res["stages"].items():
+            key = "seconds" if "seconds" in st else "p50_us"
+            if name in old and old[name].get(key):
+                ratio = st[key] / old[name][key]
+                if ratio > 1.0 + threshold:
+                    regressions.append({"rows": res["rows"], "stage": name, "ratio": ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de treino e inferência em datasets sintéticos.")
+    parser.add_argument("--csv", default=str(ROOT / "data" / "iris.csv"),
+                        help="CSV de referência para ajustar as gaussianas (padrão: data/iris.csv).")
+    parser.add_argument("--sizes", default="150,10000,100000,1000000",
+                        help='Tamanhos separados por vírgula. Ex: "150,1000000,10000000".')
+    parser.add_argument("--out", default=str(ROOT / "bench" / "results.json"),
+                        help="Arquivo JSON de saída (padrão: bench/results.json).")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Não medir pico de memória (evita o 2º passe com tracemalloc).")
+    parser.add_argument("--cli-repeats", type=int, default=5,
+                        help="Execuções da CLI para medir o startup (0 = pular; padrão: 5).")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para detectar regressões.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Piora relativa tolerada no --compare (padrão: 0.2 = 20%%).")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    clf_ref, cols = reference_model(Path(args.csv))
+
+    report = {"meta": run_metadata(), "results": []}
+    with tempfile.TemporaryDirectory(prefix="iris_bench_") as tmp:
+        for n in sizes:
+            res = bench_size(clf_ref, cols, n, Path(tmp), memory=not args.no_memory)
+            report["results"].append(res)
+            s = res["stages"]
+            print(f"{n:>12,} linhas | parse {s['csv_parse']['seconds']:.3f}s | "
+                  f"cache {s['typed_load_cached']['seconds']:.3f}s | "
+                  f"normalize {s['normalize_species']['seconds']:.3f}s | "
+                  f"replace {s['replace_mapping']['seconds']:.3f}s | "
+                  f"encode (vetorizado) {s['encode_species']['seconds']:.3f}s | fit {s['fit']['seconds']:.3f}s | "
+                  f"single p50 {s['predict_single']['p50_us']:.0f}µs | "
+                  f"batch {s['predict_batch']['rows_per_sec']:,.0f} linhas/s")
+            f64, f32 = s["train_float64"], s["train_float32"]
+            if "peak_saving_pct" in f32:
+                print(f"{'':>12} treino float32: pico {f32['peak_mb']:.1f} MB vs {f64['peak_mb']:.1f} MB "
+                      f"(-{f32['peak_saving_pct']:.0f}%), accuracy {f32['accuracy']:.4f} vs {f64['accuracy']:.4f}"
+                      f"{'' if f32['accuracy_equal'] else ' (DIFERENTE)'}")
+
+    if args.cli_repeats > 0:
+        report["cli_startup"] = bench_cli_startup(args.cli_repeats)
+        cli = report["cli_startup"]
+        if "error" in cli:
+            print(f"CLI startup: não medido ({cli['error']})")
+        else:
+            print(f"CLI startup (--plain): {cli['wall_ms']:.0f} ms de parede, "
+                  f"imports {cli['imports_ms']:.0f} ms, modelo ({cli['model_backend']}) {cli['load_model_ms']:.1f} ms")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        report["regressions"] = compare(report, baseline, args.threshold)
+        for r in report["regressions"]:
+            print(f"REGRESSÃO: {r['stage']} com {r['rows']:,} linhas está {r['ratio']:.2f}x mais lento")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados salvos em: {out}")
+
+
+if __name__ == "__main__":
+    main()
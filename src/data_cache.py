@@ -0,0 +1,123 @@
+# Leitura tipada do CSV (float32/float64 + categoria) com cache binário em .npy (memory-map)
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils import find_species_column, resolve_feature_columns
+
+CACHE_FORMAT = 2
+
+
+def file_digest(path: Path, block_size=1 << 20) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def tail_digest(path: Path, offset: int, n_bytes=4096) -> str:
+    """sha256 dos n_bytes antes de offset: checagem barata de que o prefixo já
+    usado no treino não foi reescrito (só recebeu linhas novas no fim)."""
+    start = max(offset - n_bytes, 0)
+    with Path(path).open("rb") as fh:
+        fh.seek(start)
+        return hashlib.sha256(fh.read(offset - start)).hexdigest()
+
+
+def _parse_typed(csv_path: Path, dtype=np.float32):
+    header = pd.read_csv(csv_path, nrows=0)
+    species_col = find_species_column(header.columns)
+    cols = resolve_feature_columns(header)
+    dtypes = {c: dtype for c in cols}
+    dtypes[species_col] = "category"
+    df = pd.read_csv(csv_path, usecols=[*cols, species_col], dtype=dtypes)
+    return df, cols, species_col
+
+
+def _frame_from_arrays(X, codes, categories, cols, species_col):
+    df = pd.DataFrame(X, columns=cols, copy=False)
+    df[species_col] = pd.Categorical.from_codes(codes, categories=categories)
+    return df
+
+
+def _write_cache(entry: Path, df, cols, species_col, stat, digest):
+    entry.mkdir(parents=True, exist_ok=True)
+    X = np.ascontiguousarray(df[cols].to_numpy())
+    cat = df[species_col].cat
+    # escrita atômica: arquivos temporários + os.replace; o meta.json vai por último
+    for name, arr in (("X.npy", X), ("codes.npy", cat.codes.to_numpy())):
+        tmp = entry / f"{name}.tmp"
+        with tmp.open("wb") as fh:
+            np.save(fh, arr)
+        os.replace(tmp, entry / name)
+    meta = {
+        "format": CACHE_FORMAT,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest,
+        "feature_columns": cols,
+        "species_column": species_col,
+        "categories": [str(c) for c in cat.categories],
+        "n_rows": int(len(df)),
+    }
+    tmp = entry / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, entry / "meta.json")
+
+
+def load_typed_csv(csv_path, cache_dir=None, use_cache=True, dtype=np.float32):
+    """Lê o CSV com dtypes fixos (features em dtype, species categórica).
+
+    Com cache, o resultado fica em <cache_dir>/<nome_do_csv>/<dtype>/ como .npy e é
+    reaberto via memory-map enquanto tamanho/mtime do CSV não mudarem (se só o
+    mtime mudou, o sha256 do conteúdo decide). Retorna (df, info) onde info
+    diz se houve hit no cache.
+    """
+    csv_path = Path(csv_path)
+    if not use_cache:
+        df, _, _ = _parse_typed(csv_path, dtype)
+        return df, {"cache": "disabled"}
+
+    cache_dir = Path(cache_dir) if cache_dir else csv_path.parent / ".cache"
+    entry = cache_dir / csv_path.name / np.dtype(dtype).name
+    stat = csv_path.stat()
+
+    meta_path = entry / "meta.json"
+    meta = None
+    if meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            meta = None
+    if meta and meta.get("format") != CACHE_FORMAT:
+        meta = None
+
+    status = None
+    digest = None
+    if meta and meta["size"] == stat.st_size:
+        if meta["mtime_ns"] == stat.st_mtime_ns:
+            status = "hit"
+        else:
+            digest = file_digest(csv_path)
+            if digest == meta["sha256"]:
+                # conteúdo igual (ex.: arquivo copiado/tocado): só atualiza o mtime
+                meta["mtime_ns"] = stat.st_mtime_ns
+                tmp = entry / "meta.json.tmp"
+                tmp.write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp, meta_path)
+                status = "hit (sha256)"
+
+    if status:
+        X = np.load(entry / "X.npy", mmap_mode="r")
+        codes = np.load(entry / "codes.npy", mmap_mode="r")
+        df = _frame_from_arrays(X, codes, meta["categories"], meta["feature_columns"], meta["species_column"])
+        return df, {"cache": status, "path": str(entry)}
+
+    df, cols, species_col = _parse_typed(csv_path, dtype)
+    _write_cache(entry, df, cols, species_col, stat, digest or file_digest(csv_path))
+    return df, {"cache": "miss", "path": str(entry)}
@@ -0,0 +1,320 @@
+# Monitor de drift: estatísticas em streaming das entradas servidas vs. theta_/var_ do treino
+import json
+import math
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from registry import atomic_write_text, token_fields
+
+DEFAULT_THRESHOLD = 0.5   # deslocamento da média, em desvios-padrão do treino
+PSI_THRESHOLD = 0.2       # PSI acima disso = distribuição mudou (regra usual)
+DEFAULT_BINS = 10
+DEFAULT_MIN_ROWS = 100    # abaixo disso não sinaliza nada (estatística instável)
+_PSI_EPS = 1e-4
+
+
+def merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Combina (contagem, média, M2) de dois grupos (Chan et al.; Welford por lote).
+
+    Funciona elemento a elemento em arrays; grupos vazios (n=0) não alteram o outro.
+    """
+    n_a = np.asarray(n_a, dtype=np.float64)
+    n_b = np.asarray(n_b, dtype=np.float64)
+    n = n_a + n_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(n > 0, n_b / n, 0.0)
+        delta = mean_b - mean_a
+        mean = mean_a + delta * w
+        m2 = m2_a + m2_b + delta ** 2 * n_a * w
+    return n, mean, m2
+
+
+def _normal_cdf(x, mean, sd):
+    return 0.5 * (1.0 + math.erf((x - mean) / (sd * math.sqrt(2.0))))
+
+
+def psi(observed, expected):
+    """Population Stability Index entre duas distribuições (contagens ou proporções)."""
+    o = np.asarray(observed, dtype=np.float64)
+    e = np.asarray(expected, dtype=np.float64)
+    o = np.maximum(o / o.sum(), _PSI_EPS) if o.sum() else np.full_like(o, _PSI_EPS)
+    e = np.maximum(e / e.sum(), _PSI_EPS)
+    return float(np.sum((o - e) * np.log(o / e)))
+
+
+class DriftMonitor:
+    """Média/variância por feature e por classe predita, histogramas e distribuição de classes.
+
+    Memória constante: por classe só (contagem, média, M2) de cada feature, mais
+    um histograma de bins fixos por feature. update() copia as linhas para um
+    buffer e os momentos são combinados em lote (vetorizado) quando ele enche,
+    então o custo por linha é uma cópia. Comparação com o treino: theta_/var_
+    por classe e a mistura (class_prior_) para a feature como um todo.
+    """
+
+    def __init__(self, path, threshold=DEFAULT_THRESHOLD, flush_seconds=30.0, bins=DEFAULT_BINS,
+                 min_rows=DEFAULT_MIN_ROWS, buffer_rows=1024):
+        self.path = Path(path) if path else None
+        self.threshold = float(threshold)
+        self.flush_seconds = float(flush_seconds)
+        self.n_bins = int(bins)
+        self.min_rows = int(min_rows)
+        self._cap = int(buffer_rows)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # o arquivo temporário do atomic_path é por processo
+        self._token = None
+        self._ref = None
+        self._last_flush = time.monotonic()
+
+    # -- referência (modelo) ----------------------------------------------------------
+
+    def bind(self, token, clf, feature_columns, int_to_species):
+        """Associa o monitor a uma versão do modelo; se mudou, grava o resumo e recomeça."""
+        with self._lock:
+            if token == self._token:
+                return
+            if self._ref is not None and self.path is not None:
+                self._fold()
+                self._write(self._summary())
+            self._token = token
+            self._reset(clf, feature_columns, int_to_species)
+
+    def _reset(self, clf, feature_columns, int_to_species):
+        theta = np.asarray(clf.theta_, dtype=np.float64)
+        var = np.asarray(clf.var_, dtype=np.float64)
+        prior = np.asarray(clf.class_prior_, dtype=np.float64)
+        classes = np.asarray(clf.classes_)
+        k, n_features = theta.shape
+        # mistura do treino: E[x] = Σ π θ ; Var[x] = Σ π (σ² + θ²) - E[x]²
+        mix_mean = prior @ theta
+        mix_var = prior @ (var + theta ** 2) - mix_mean ** 2
+        sd = np.sqrt(var)
+        lo = (theta - 4 * sd).min(axis=0)
+        hi = (theta + 4 * sd).max(axis=0)
+        edges = np.linspace(lo, hi, self.n_bins + 1).T  # (features, bins + 1)
+        # proporção esperada por bin (+ abaixo/acima da faixa) sob a mistura do treino
+        expected = np.empty((n_features, self.n_bins + 2))
+        for f in range(n_features):
+            cdf = np.array([
+                [_normal_cdf(x, theta[c, f], sd[c, f]) for x in edges[f]] for c in range(k)
+            ])
+            cdf = np.hstack([np.zeros((k, 1)), cdf, np.ones((k, 1))])
+            expected[f] = prior @ np.diff(cdf, axis=1)
+
+        self._ref = {
+            "feature_columns": list(feature_columns),
+            "class_names": [int_to_species[int(c)] for c in classes],
+            "classes": classes,
+            "theta": theta, "var": var, "prior": prior,
+            "mix_mean": mix_mean, "mix_var": mix_var,
+            "edges": edges, "expected": expected,
+        }
+        self._lo = edges[:, 0].copy()
+        self._inv_width = self.n_bins / (edges[:, -1] - edges[:, 0])
+        self._hist_offsets = np.arange(n_features) * (self.n_bins + 2)
+        self.count = np.zeros(k, dtype=np.int64)
+        self.mean = np.zeros((k, n_features))
+        self.m2 = np.zeros((k, n_features))
+        self.hist = np.zeros((n_features, self.n_bins + 2), dtype=np.int64)
+        self.rows = 0
+        self.rejected_rows = 0  # linhas com NaN/inf: fora dos momentos e histogramas
+        self._buf_X = np.empty((self._cap, n_features))
+        self._buf_codes = np.empty(self._cap, dtype=np.int64)
+        self._buf_n = 0
+
+    # -- atualização --------------------------------------------------------------------
+
+    def update(self, X, labels):
+        """Registra um lote já pontuado (features na ordem do modelo + rótulos preditos).
+
+        Linhas com NaN/inf contaminariam médias e variâncias para sempre; elas ficam
+        de fora e só entram na contagem rejected_rows.
+        """
+        if self._ref is None:
+            return
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        labels = np.asarray(labels)
+        finite = np.isfinite(X).all(axis=1)
+        rejected = len(X) - int(finite.sum())
+        if rejected:
+            X, labels = X[finite], labels[finite]
+        codes = np.searchsorted(self._ref["classes"], labels)
+        flush = None
+        with self._lock:
+            self.rejected_rows += rejected
+            n = len(X)
+            if self._buf_n + n > self._cap:
+                self._fold()
+            if n > self._cap:
+                self._accumulate(X, codes)
+            else:
+                self._buf_X[self._buf_n:self._buf_n + n] = X
+                self._buf_codes[self._buf_n:self._buf_n + n] = codes
+                self._buf_n += n
+            if self.path is not None and time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._fold()
+                flush = self._summary()
+                self._last_flush = time.monotonic()
+        if flush is not None:
+            self._write(flush)
+
+    def _fold(self):
+        if self._buf_n:
+            self._accumulate(self._buf_X[:self._buf_n], self._buf_codes[:self._buf_n])
+            self._buf_n = 0
+
+    def _accumulate(self, X, codes):
+        k, n_features = self.mean.shape
+        n_b = np.bincount(codes, minlength=k)
+        # somas por classe via bincount em (classe, feature) achatado
+        flat = (codes[:, None] * n_features + np.arange(n_features)).ravel()
+        sums = np.bincount(flat, weights=X.ravel(), minlength=k * n_features).reshape(k, n_features)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_b = np.where(n_b[:, None] > 0, sums / n_b[:, None], 0.0)
+        centered = X - mean_b[codes]
+        m2_b = np.bincount(flat, weights=(centered * centered).ravel(),
+                           minlength=k * n_features).reshape(k, n_features)
+        _, self.mean, self.m2 = merge_moments(self.count[:, None], self.mean, self.m2, n_b[:, None], mean_b, m2_b)
+        self.count += n_b
+
+        # histograma: bin 0 = abaixo da faixa, bin n_bins + 1 = acima; um bincount para todas as features
+        idx = np.floor((X - self._lo) * self._inv_width).astype(np.int64) + 1
+        np.clip(idx, 0, self.n_bins + 1, out=idx)
+        self.hist += np.bincount((idx + self._hist_offsets).ravel(),
+                                 minlength=self.hist.size).reshape(self.hist.shape)
+        self.rows += len(X)
+
+    def state(self):
+        """Momentos e histogramas acumulados (para juntar monitores de outros processos)."""
+        with self._lock:
+            self._fold()
+            return {"count": self.count.copy(), "mean": self.mean.copy(), "m2": self.m2.copy(),
+                    "hist": self.hist.copy(), "rows": self.rows, "rejected_rows": self.rejected_rows}
+
+    def merge(self, state):
+        """Incorpora o state() de outro monitor ligado ao mesmo modelo (ex.: um worker)."""
+        with self._lock:
+            _, self.mean, self.m2 = merge_moments(self.count[:, None], self.mean, self.m2,
+                                                  state["count"][:, None], state["mean"], state["m2"])
+            self.count += state["count"]
+            self.hist += state["hist"]
+            self.rows += state["rows"]
+            self.rejected_rows += state["rejected_rows"]
+
+    # -- resumo -------------------------------------------------------------------------
+
+    def snapshot(self):
+        """Resumo atual (dict pronto para JSON), incluindo as linhas ainda no buffer."""
+        with self._lock:
+            if self._ref is None:
+                return {"rows": 0, "rejected_rows": 0, "drift": False, "alerts": []}
+            self._fold()
+            return self._summary()
+
+    def _shift(self, n, mean, var, ref_mean, ref_var):
+        """Deslocamento da média (em desvios do treino) e razão de desvios; drift se passar do limite."""
+        ref_sd = math.sqrt(ref_var)
+        shift = abs(mean - ref_mean) / ref_sd
+        std_ratio = math.sqrt(var) / ref_sd if var is not None else None
+        flagged = None
+        if n >= self.min_rows:
+            flagged = bool(shift > self.threshold
+                           or (std_ratio is not None and abs(math.log(max(std_ratio, 1e-12))) > math.log1p(self.threshold)))
+        return {"mean_shift_sd": shift, "std_ratio": std_ratio, "drift": flagged}
+
+    def _summary(self):
+        ref = self._ref
+        names, class_names = ref["feature_columns"], ref["class_names"]
+        alerts = []
+
+        # feature como um todo: junta as classes e compara com a mistura do treino
+        n_tot = 0.0
+        mean_tot = np.zeros(len(names))
+        m2_tot = np.zeros(len(names))
+        for c in range(len(class_names)):
+            n_tot, mean_tot, m2_tot = merge_moments(n_tot, mean_tot, m2_tot,
+                                                    float(self.count[c]), self.mean[c], self.m2[c])
+        features = {}
+        for f, name in enumerate(names):
+            var = float(m2_tot[f] / (n_tot - 1)) if n_tot > 1 else None
+            entry = {
+                "count": int(n_tot),
+                "mean": float(mean_tot[f]) if n_tot else None,
+                "var": var,
+                "ref_mean": float(ref["mix_mean"][f]),
+                "ref_var": float(ref["mix_var"][f]),
+            }
+            if n_tot:
+                entry.update(self._shift(n_tot, entry["mean"], var, entry["ref_mean"], entry["ref_var"]))
+                entry["psi"] = psi(self.hist[f], ref["expected"][f])
+                if n_tot >= self.min_rows and entry["psi"] > PSI_THRESHOLD:
+                    entry["drift"] = True
+            entry["histogram"] = {
+                "edges": ref["edges"][f].tolist(),
+                "counts": self.hist[f].tolist(),  # [abaixo da faixa, bins..., acima da faixa]
+                "expected": ref["expected"][f].tolist(),
+            }
+            if entry.get("drift"):
+                alerts.append(f"{name}: média deslocada {entry['mean_shift_sd']:.2f} dp, "
+                              f"razão de dp {entry['std_ratio'] or 0:.2f}, PSI {entry['psi']:.3f}")
+            features[name] = entry
+
+        classes = {}
+        for c, cname in enumerate(class_names):
+            n = int(self.count[c])
+            per_feature = {}
+            for f, name in enumerate(names):
+                var = float(self.m2[c, f] / (n - 1)) if n > 1 else None
+                item = {"mean": float(self.mean[c, f]) if n else None, "var": var,
+                        "ref_mean": float(ref["theta"][c, f]), "ref_var": float(ref["var"][c, f])}
+                if n:
+                    item.update(self._shift(n, item["mean"], var, item["ref_mean"], item["ref_var"]))
+                    if item["drift"]:
+                        alerts.append(f"{cname}/{name}: média deslocada {item['mean_shift_sd']:.2f} dp, "
+                                      f"razão de dp {item['std_ratio'] or 0:.2f}")
+                per_feature[name] = item
+            classes[cname] = {
+                "count": n,
+                "share": n / n_tot if n_tot else None,
+                "ref_share": float(ref["prior"][c]),
+                "features": per_feature,
+            }
+
+        class_psi = psi(self.count, ref["prior"]) if n_tot else None
+        class_drift = bool(n_tot >= self.min_rows and class_psi > PSI_THRESHOLD) if n_tot else None
+        if class_drift:
+            alerts.append(f"distribuição de classes preditas: PSI {class_psi:.3f}")
+
+        return {
+            **token_fields(self._token),
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "rows": int(self.rows),
+            "rejected_rows": int(self.rejected_rows),
+            "threshold": self.threshold,
+            "psi_threshold": PSI_THRESHOLD,
+            "min_rows": self.min_rows,
+            "drift": bool(alerts),
+            "alerts": alerts,
+            "features": features,
+            "classes": classes,
+            "class_distribution": {"psi": class_psi, "drift": class_drift},
+        }
+
+    def _write(self, summary):
+        with self._write_lock:
+            atomic_write_text(self.path, json.dumps(summary, indent=2, ensure_ascii=False))
+
+    def flush(self):
+        """Grava o resumo agora (ex.: no fim do lote ou ao desligar o serviço)."""
+        if self.path is None:
+            return None
+        summary = self.snapshot()
+        self._write(summary)
+        with self._lock:
+            self._last_flush = time.monotonic()
+        return summary
@@ -0,0 +1,139 @@
+# Métricas de classificação derivadas de uma única matriz de confusão (um bincount por lote)
+import numpy as np
+
+AVERAGES = ("macro avg", "weighted avg")
+
+
+class ConfusionAccumulator:
+    """Matriz de confusão acumulável por chunks (linhas = verdadeiro, colunas = predito).
+
+    Cada update() converte os rótulos em códigos 0..k-1 e faz um único
+    np.bincount sobre true * k + pred. Rótulos fora de `labels` são ignorados,
+    como em sklearn.metrics.confusion_matrix(labels=...).
+    """
+
+    def __init__(self, labels):
+        self.labels = np.asarray(labels)
+        k = len(self.labels)
+        self.cm = np.zeros((k, k), dtype=np.int64)
+        self._lut = None
+        if self.labels.dtype.kind in "iu" and k and self.labels.min() >= 0 and self.labels.max() < 1 << 16:
+            # rótulos inteiros pequenos (1/2/3): tabela de consulta direta
+            self._lut = np.full(int(self.labels.max()) + 1, -1, dtype=np.int64)
+            self._lut[self.labels] = np.arange(k)
+        else:
+            self._sorter = np.argsort(self.labels)
+            self._sorted = self.labels[self._sorter]
+
+    def _codes(self, y):
+        y = np.asarray(y)
+        if self._lut is not None and y.dtype.kind in "iu":
+            outside = y >= len(self._lut)
+            if y.dtype.kind == "i":
+                outside |= y < 0
+            if outside.any():
+                codes = self._lut[np.where(outside, 0, y)]
+                codes[outside] = -1
+                return codes
+            return self._lut[y]
+        pos = np.clip(np.searchsorted(self._sorted, y), 0, len(self._sorted) - 1)
+        return np.where(self._sorted[pos] == y, self._sorter[pos], -1)
+
+    def update(self, y_true, y_pred):
+        k = len(self.labels)
+        t = self._codes(y_true)
+        p = self._codes(y_pred)
+        combined = t * k + p
+        if (t < 0).any() or (p < 0).any():
+            combined = combined[(t >= 0) & (p >= 0)]
+        self.cm += np.bincount(combined, minlength=k * k).reshape(k, k)
+        return self
+
+    def merge(self, other):
+        self.cm += other.cm
+        return self
+
+    @property
+    def n_samples(self):
+        return int(self.cm.sum())
+
+    def accuracy(self):
+        return accuracy_from_confusion(self.cm)
+
+    def report(self, target_names):
+        return report_from_confusion(self.cm, target_names)
+
+
+def confusion_matrix(y_true, y_pred, labels):
+    return ConfusionAccumulator(labels).update(y_true, y_pred).cm
+
+
+def accuracy_from_confusion(cm) -> float:
+    cm = np.asarray(cm)
+    total = cm.sum()
+    return float(np.trace(cm) / total) if total else 0.0
+
+
+def report_from_confusion(cm, target_names):
+    """Mesmo formato do classification_report(output_dict=True) do sklearn.
+
+    Precision/recall/F1 sem amostras (divisão por zero) valem 0.0, como o
+    padrão zero_division="warn" do sklearn (sem o aviso).
+    """
+    cm = np.asarray(cm, dtype=np.int64)
+    tp = np.diag(cm).astype(np.float64)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        # 2·tp / (support + predicted), como o sklearn: mesma fórmula, mesmos arredondamentos
+        denom = support + predicted
+        f1 = np.where(denom > 0, 2 * tp / denom, 0.0)
+
+    report = {}
+    for i, name in enumerate(target_names):
+        report[name] = {
+            "precision": float(precision[i]),
+            "recall": float(recall[i]),
+            "f1-score": float(f1[i]),
+            "support": float(support[i]),
+        }
+    total = int(support.sum())
+    report["accuracy"] = accuracy_from_confusion(cm)
+    report["macro avg"] = {
+        "precision": float(precision.mean()),
+        "recall": float(recall.mean()),
+        "f1-score": float(f1.mean()),
+        "support": float(total),
+    }
+    w = support / total if total else np.zeros(len(support))
+    report["weighted avg"] = {
+        "precision": float(precision @ w),
+        "recall": float(recall @ w),
+        "f1-score": float(f1 @ w),
+        "support": float(total),
+    }
+    return report
+
+
+def format_report(report, target_names, digits=2):
+    """Texto no layout do classification_report do sklearn (a partir do dict)."""
+    headers = ["precision", "recall", "f1-score", "support"]
+    width = max(max((len(n) for n in target_names), default=0), len("weighted avg"), digits)
+    head_fmt = "{:>{width}s} " + " {:>9}" * len(headers)
+    row_fmt = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+    out = head_fmt.format("", *headers, width=width) + "\n\n"
+    for name in target_names:
+        r = report[name]
+        out += row_fmt.format(name, r["precision"], r["recall"], r["f1-score"], int(r["support"]),
+                              width=width, digits=digits)
+    out += "\n"
+    total = int(report["macro avg"]["support"])
+    acc_fmt = "{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f}" + " {:>9}\n"
+    out += acc_fmt.format("accuracy", "", "", report["accuracy"], total, width=width, digits=digits)
+    for avg in AVERAGES:
+        r = report[avg]
+        out += row_fmt.format(avg, r["precision"], r["recall"], r["f1-score"], int(r["support"]),
+                              width=width, digits=digits)
+    return out
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# Tabelas de log-densidade por feature: inferência GaussianNB só com consultas e somas
+import argparse
+import hashlib
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from nb_numpy import CompiledNB
+
+# As medições têm resolução de 0.1 cm e ficam dentro da faixa observada no
+# treino. Como o Naive Bayes é independente por feature, o log-posterior não
+# normalizado é log prior + soma de 4 termos 1-D:
+#     jll[c] = log P(c) + sum_f log N(x_f; theta[c, f], var[c, f])
+# Basta guardar uma tabela (bins × classes) por feature em vez de uma grade 4-D.
+
+DEFAULT_STEP = 0.1
+
+
+def grid_bounds(lo, hi, step=DEFAULT_STEP, margin=0.0):
+    """Limites da grade por feature, alinhados a múltiplos de step."""
+    lo = np.floor((np.asarray(lo, dtype=np.float64) - margin) / step + 1e-9) * step
+    hi = np.ceil((np.asarray(hi, dtype=np.float64) + margin) / step - 1e-9) * step
+    n_bins = np.rint((hi - lo) / step).astype(np.int64) + 1
+    return lo, n_bins
+
+
+def build_tables(theta, var, class_prior, lo, n_bins, step=DEFAULT_STEP):
+    """Tabela achatada (soma dos bins de todas as features × classes) e offset de cada feature.
+
+    O log prior entra na tabela da primeira feature, então a inferência é só
+    soma de consultas.
+    """
+    theta = np.asarray(theta, dtype=np.float64)
+    var = np.asarray(var, dtype=np.float64)
+    offsets = np.concatenate([[0], np.cumsum(n_bins)[:-1]]).astype(np.int64)
+    tables = np.empty((int(n_bins.sum()), theta.shape[0]), dtype=np.float64)
+    for f in range(theta.shape[1]):
+        x = lo[f] + step * np.arange(n_bins[f])
+        # mesma expressão do sklearn (_joint_log_likelihood), por feature
+        block = -0.5 * np.log(2.0 * np.pi * var[:, f]) - 0.5 * (x[:, None] - theta[:, f]) ** 2 / var[:, f]
+        if f == 0:
+            block = block + np.log(class_prior)
+        tables[offsets[f]:offsets[f] + n_bins[f]] = block
+    return tables, offsets
+
+
+def model_fingerprint(clf) -> str:
+    """sha256 dos parâmetros (theta, var, prior, classes): igual para o .joblib e o .npz do mesmo modelo."""
+    h = hashlib.sha256()
+    for arr in (clf.theta_, clf.var_, clf.class_prior_):
+        h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    h.update(np.asarray(clf.classes_, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def export_lookup(clf, feature_columns, species_to_int, int_to_species, lo, hi, path, step=DEFAULT_STEP, margin=0.0,
+                  source_model=None):
+    """Grava as tabelas num .npz (sem pickle) junto com theta/var para o fallback exato.
+
+    source_model (o --model de origem) e a impressão digital dos parâmetros
+    permitem ao load_model detectar tabelas de um modelo que já foi retreinado.
+    """
+    grid_lo, n_bins = grid_bounds(lo, hi, step, margin)
+    tables, offsets = build_tables(clf.theta_, clf.var_, clf.class_prior_, grid_lo, n_bins, step)
+    meta = {
+        "feature_columns": list(feature_columns),
+        "species_to_int": species_to_int,
+        "int_to_species": {str(k): v for k, v in int_to_species.items()},
+        "step": step,
+        "source_model": str(Path(source_model).resolve()) if source_model else None,
+        "model_fingerprint": model_fingerprint(clf),
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as fh:
+        np.savez(
+            fh,
+            log_tables=tables,
+            offsets=offsets,
+            grid_lo=grid_lo,
+            n_bins=n_bins,
+            theta=np.asarray(clf.theta_, dtype=np.float64),
+            var=np.asarray(clf.var_, dtype=np.float64),
+            class_prior=np.asarray(clf.class_prior_, dtype=np.float64),
+            classes=np.asarray(clf.classes_),
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+        )
+    return path
+
+
+class LookupNB:
+    """Mesma interface de predição do GaussianNB (predict, predict_proba, classes_).
+
+    Linhas com todas as features sobre a grade usam as tabelas; as demais
+    (fora da faixa ou fora da resolução de step) caem no CompiledNB, então o
+    resultado nunca depende da grade cobrir a entrada.
+    """
+
+    def __init__(self, tables, offsets, grid_lo, n_bins, step, theta, var, class_prior, classes):
+        self.tables = np.ascontiguousarray(tables, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.grid_lo = np.asarray(grid_lo, dtype=np.float64)
+        self.n_bins = np.asarray(n_bins, dtype=np.int64)
+        self.step = float(step)
+        self.classes_ = np.asarray(classes)
+        self.exact = CompiledNB(theta, var, class_prior, classes)
+        # tolerância para considerar x sobre a grade (cobre entradas float32)
+        self._tol = 1e-4
+        # cópia em listas para o caminho de uma linha só (sem overhead do NumPy)
+        self._rows = [self.tables[o:o + n].tolist() for o, n in zip(self.offsets.tolist(), self.n_bins.tolist())]
+        self._lo = self.grid_lo.tolist()
+
+    @property
+    def theta_(self):
+        return self.exact.theta_
+
+    @property
+    def var_(self):
+        return self.exact.var_
+
+    @property
+    def class_prior_(self):
+        return self.exact.class_prior_
+
+    def _codes(self, X):
+        """Índice na tabela achatada (bin + offset da feature) e máscara das linhas sobre a grade."""
+        pos = (X - self.grid_lo) / self.step
+        codes = np.rint(pos)
+        ok = (np.abs(pos - codes) <= self._tol) & (codes >= 0) & (codes < self.n_bins)
+        return codes.astype(np.int64) + self.offsets, ok.all(axis=1)
+
+    def _lookup_sum(self, idx):
+        # uma consulta (linha de classes) por feature, somadas: mais rápido que gather 3-D + sum
+        jll = self.tables[idx[:, 0]]
+        for f in range(1, idx.shape[1]):
+            jll += self.tables[idx[:, f]]
+        return jll
+
+    def joint_log_likelihood(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        idx, on_grid = self._codes(X)
+        if on_grid.all():
+            return self._lookup_sum(idx)
+        jll = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        jll[on_grid] = self._lookup_sum(idx[on_grid])
+        jll[~on_grid] = self.exact.joint_log_likelihood(X[~on_grid])
+        return jll
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 2 and len(X) <= 4:
+            # poucas linhas: o caminho em Python puro evita o overhead fixo do NumPy
+            return np.array([self.proba_one(row) for row in X.tolist()], dtype=np.float64).reshape(len(X), -1)
+        jll = self.joint_log_likelihood(X)
+        jll -= jll.max(axis=1, keepdims=True)
+        np.exp(jll, out=jll)
+        jll /= jll.sum(axis=1, keepdims=True)
+        return jll
+
+    def predict(self, X):
+        return self.classes_[self.joint_log_likelihood(X).argmax(axis=1)]
+
+    def proba_one(self, values):
+        """Uma linha em Python puro (listas + math): menor latência para chamadas isoladas."""
+        step, tol = self.step, self._tol
+        jll = None
+        for f, x in enumerate(values):
+            pos = (float(x) - self._lo[f]) / step
+            i = round(pos)
+            table = self._rows[f]
+            if abs(pos - i) > tol or not 0 <= i < len(table):
+                return self.exact.predict_proba([values])[0].tolist()
+            row = table[i]
+            jll = list(row) if jll is None else [a + b for a, b in zip(jll, row)]
+        top = max(jll)
+        e = [math.exp(v - top) for v in jll]
+        s = sum(e)
+        return [v / s for v in e]
+
+
+def _read_lookup(path):
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Tabelas não encontradas: {path}. Rode antes: python src/lookup_table.py")
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        model = LookupNB(data["log_tables"], data["offsets"], data["grid_lo"], data["n_bins"], meta["step"],
+                         data["theta"], data["var"], data["class_prior"], data["classes"])
+    int_to_species = {int(k): v for k, v in meta["int_to_species"].items()}
+    return (model, meta["feature_columns"], meta["species_to_int"], int_to_species), meta
+
+
+def load_lookup(path, check_source=True):
+    """Carrega o .npz de tabelas; retorna a mesma tupla de load_bundle/load_compiled.
+
+    Se o modelo de origem ainda existe e foi retreinado desde a exportação (a
+    impressão digital dos parâmetros não bate), as tabelas estão velhas: avisa
+    no stderr e devolve o modelo atual em vez delas.
+    """
+    loaded, meta = _read_lookup(path)
+    source = meta.get("source_model")
+    if not check_source or not source or not Path(source).exists():
+        return loaded  # tabelas avulsas (ex.: copiadas para a borda sem o modelo)
+
+    from scoring import load_model
+
+    current = load_model(Path(source))
+    if model_fingerprint(current[0]) != meta.get("model_fingerprint"):
+        print(f"Aviso: {path} foi gerado de outra versão de {source}; usando o modelo atual. "
+              "Rode python src/lookup_table.py para refazer as tabelas.", file=sys.stderr)
+        return current
+    return loaded
+
+
+def observed_ranges(csv_path, feature_columns, chunksize=1_000_000):
+    """Mínimo e máximo de cada feature no CSV, lido em chunks."""
+    from scoring import iter_feature_chunks
+
+    lo = hi = None
+    for _, X in iter_feature_chunks(csv_path, feature_columns, chunksize):
+        if not len(X):
+            continue
+        cmin, cmax = np.nanmin(X, axis=0), np.nanmax(X, axis=0)
+        lo = cmin if lo is None else np.minimum(lo, cmin)
+        hi = cmax if hi is None else np.maximum(hi, cmax)
+    if lo is None:
+        raise ValueError(f"CSV sem linhas: {csv_path}")
+    return lo, hi
+
+
+def _time_per_call(fn, repeats):
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) / repeats
+
+
+def benchmark(clf, lut, batch_size=100_000, repeats=2000, seed=0):
+    """Desvio máximo vs clf.predict_proba e latência/throughput (sklearn, NumPy, tabelas)."""
+    rng = np.random.default_rng(seed)
+    # entradas sobre a grade: amostras do próprio modelo arredondadas a step e dentro da faixa
+    cls_idx = rng.integers(0, len(clf.classes_), size=batch_size)
+    X = rng.normal(clf.theta_[cls_idx], np.sqrt(clf.var_[cls_idx]))
+    hi = lut.grid_lo + (lut.n_bins - 1) * lut.step
+    X = np.clip(np.round(np.rint(X / lut.step) * lut.step, 6), lut.grid_lo, hi)
+    row = X[:1].copy()
+    row_list = row[0].tolist()
+
+    ref = clf.predict_proba(X)
+    max_abs_diff = float(np.max(np.abs(lut.predict_proba(X) - ref)))
+    max_abs_diff_one = float(np.max(np.abs(np.asarray(lut.proba_one(row_list)) - ref[0])))
+    same_labels = bool(np.array_equal(lut.predict(X), clf.predict(X)))
+
+    single = {
+        "sklearn": _time_per_call(lambda: clf.predict_proba(row), repeats) * 1e6,
+        "numpy": _time_per_call(lambda: lut.exact.predict_proba(row), repeats) * 1e6,
+        "lookup": _time_per_call(lambda: lut.predict_proba(row), repeats) * 1e6,
+        "lookup_one": _time_per_call(lambda: lut.proba_one(row_list), repeats) * 1e6,
+    }
+    batch = {
+        "sklearn": batch_size / _time_per_call(lambda: clf.predict_proba(X), 5),
+        "numpy": batch_size / _time_per_call(lambda: lut.exact.predict_proba(X), 5),
+        "lookup": batch_size / _time_per_call(lambda: lut.predict_proba(X), 5),
+    }
+    return {
+        "batch_size": batch_size,
+        "table_bins": lut.n_bins.tolist(),
+        "table_bytes": int(lut.tables.nbytes),
+        "max_abs_diff_proba": max(max_abs_diff, max_abs_diff_one),
+        "same_labels": same_labels,
+        "single_row_us": single,
+        "batch_rows_per_sec": batch,
+        "speedup_vs_sklearn": {
+            "single_row": single["sklearn"] / min(single["lookup"], single["lookup_one"]),
+            "batch": batch["lookup"] / batch["sklearn"],
+        },
+    }
+
+
+def main():
+    root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Exporta tabelas de log-densidade por feature (grade de 0.1 cm) e mede contra o sklearn."
+    )
+    parser.add_argument("--model", default=None,
+                        help="Arquivo .joblib do modelo ou diretório do registro "
+                             "(padrão: models/registry se existir, senão models/iris_nb.joblib).")
+    parser.add_argument("--csv", default=None,
+                        help="CSV de onde saem as faixas observadas (padrão: o CSV do treino).")
+    parser.add_argument("--out", default=str(root / "models" / "iris_nb.lut.npz"),
+                        help="Arquivo .npz das tabelas.")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP, help="Resolução da grade (padrão: 0.1).")
+    parser.add_argument("--margin", type=float, default=0.0,
+                        help="Folga além da faixa observada, na unidade das features (padrão: 0).")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="Linhas no teste de throughput.")
+    parser.add_argument("--atol", type=float, default=1e-9, help="Tolerância máxima nas probabilidades.")
+    parser.add_argument("--no-bench", action="store_true", help="Só exporta as tabelas.")
+    args = parser.parse_args()
+    if args.step <= 0 or args.margin < 0:
+        parser.error("--step deve ser positivo e --margin não pode ser negativo.")
+
+    import joblib
+    from registry import default_model_path, resolve_model_path
+
+    model_path = resolve_model_path(Path(args.model) if args.model else default_model_path())
+    if not model_path.exists():
+        raise FileNotFoundError(f"Modelo não encontrado: {model_path}. Rode antes: python src/train.py")
+    bundle = joblib.load(model_path)
+    clf, feature_columns = bundle["model"], bundle["feature_columns"]
+    csv_path = args.csv or (bundle.get("training_state") or {}).get("csv") or root / "data" / "iris.csv"
+
+    lo, hi = observed_ranges(csv_path, feature_columns)
+    out = export_lookup(clf, feature_columns, bundle["species_to_int"], bundle["int_to_species"], lo, hi, args.out,
+                        args.step, args.margin, source_model=args.model or default_model_path())
+    print(f"Tabelas salvas em: {out}")
+    if args.no_bench:
+        return
+
+    lut, _, _, _ = load_lookup(out, check_source=False)
+    result = benchmark(clf, lut, batch_size=args.batch_size)
+    print(json.dumps(result, indent=2))
+    if result["max_abs_diff_proba"] > args.atol or not result["same_labels"]:
+        raise SystemExit(f"Divergência acima da tolerância ({args.atol}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# Inferência GaussianNB em NumPy puro: sem importar scikit-learn/scipy na hora de servir
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def export_compiled(clf, feature_columns, species_to_int, int_to_species, path):
+    """Exporta theta_, var_, class_prior_ e classes_ num .npz pequeno (sem pickle)."""
+    meta = {
+        "feature_columns": list(feature_columns),
+        "species_to_int": species_to_int,
+        "int_to_species": {str(k): v for k, v in int_to_species.items()},
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as fh:
+        np.savez(
+            fh,
+            theta=np.asarray(clf.theta_, dtype=np.float64),
+            var=np.asarray(clf.var_, dtype=np.float64),
+            class_prior=np.asarray(clf.class_prior_, dtype=np.float64),
+            classes=np.asarray(clf.classes_),
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+        )
+    return path
+
+
+class CompiledNB:
+    """Mesma interface de predição do GaussianNB (predict, predict_proba, classes_)."""
+
+    def __init__(self, theta, var, class_prior, classes):
+        self.theta_ = np.asarray(theta, dtype=np.float64)
+        self.var_ = np.asarray(var, dtype=np.float64)
+        self.class_prior_ = np.asarray(class_prior, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+
+        # log N(x; theta, var) somado nas features, expandido em forma matricial:
+        #   -0.5 * sum(x^2 / var) + sum(x * theta / var) + const
+        inv_var = 1.0 / self.var_
+        self._neg_half_inv_var_t = np.ascontiguousarray((-0.5 * inv_var).T)
+        self._theta_inv_var_t = np.ascontiguousarray((self.theta_ * inv_var).T)
+        self._const = (
+            np.log(self.class_prior_)
+            - 0.5 * np.sum(np.log(2.0 * np.pi * self.var_), axis=1)
+            - 0.5 * np.sum(self.theta_ ** 2 * inv_var, axis=1)
+        )
+
+    def joint_log_likelihood(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return (X * X) @ self._neg_half_inv_var_t + X @ self._theta_inv_var_t + self._const
+
+    def predict_proba(self, X):
+        jll = self.joint_log_likelihood(X)
+        jll -= jll.max(axis=1, keepdims=True)
+        np.exp(jll, out=jll)
+        jll /= jll.sum(axis=1, keepdims=True)
+        return jll
+
+    def predict(self, X):
+        return self.classes_[self.joint_log_likelihood(X).argmax(axis=1)]
+
+
+def load_compiled(path):
+    """Carrega o .npz exportado; retorna a mesma tupla de load_bundle."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Modelo compilado não encontrado: {path}. Rode antes: python src/train.py")
+    with np.load(path, allow_pickle=False) as data:
+        model = CompiledNB(data["theta"], data["var"], data["class_prior"], data["classes"])
+        meta = json.loads(str(data["meta"]))
+    int_to_species = {int(k): v for k, v in meta["int_to_species"].items()}
+    return model, meta["feature_columns"], meta["species_to_int"], int_to_species
+
+
+def _time_per_call(fn, repeats):
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) / repeats
+
+
+def benchmark(model_path, compiled_path, batch_size=100_000, repeats=2000):
+    """Compara com o predict_proba do sklearn: tolerância, latência e throughput."""
+    import joblib  # só no benchmark: o caminho de inferência não importa sklearn
+
+    bundle = joblib.load(model_path)
+    clf = bundle["model"]
+    fast, _, _, _ = load_compiled(compiled_path)
+
+    rng = np.random.default_rng(0)
+    cls_idx = rng.integers(0, len(clf.classes_), size=batch_size)
+    X = rng.normal(clf.theta_[cls_idx], np.sqrt(clf.var_[cls_idx]))
+    row = X[:1].copy()
+
+    max_abs_diff = float(np.max(np.abs(fast.predict_proba(X) - clf.predict_proba(X))))
+    same_labels = bool(np.array_equal(fast.predict(X), clf.predict(X)))
+
+    sk_row = _time_per_call(lambda: clf.predict_proba(row), repeats)
+    np_row = _time_per_call(lambda: fast.predict_proba(row), repeats)
+    sk_batch = _time_per_call(lambda: clf.predict_proba(X), 5)
+    np_batch = _time_per_call(lambda: fast.predict_proba(X), 5)
+
+    return {
+        "batch_size": batch_size,
+        "max_abs_diff_proba": max_abs_diff,
+        "same_labels": same_labels,
+        "single_row_us": {"sklearn": sk_row * 1e6, "numpy": np_row * 1e6},
+        "batch_rows_per_sec": {"sklearn": batch_size / sk_batch, "numpy": batch_size / np_batch},
+    }
+
+
+def main():
+    root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="Benchmark do modelo compilado (NumPy) vs sklearn.")
+    parser.add_argument("--model", default=str(root / "models" / "iris_nb.joblib"),
+                        help="Arquivo .joblib do modelo sklearn.")
+    parser.add_argument("--compiled", default=str(root / "models" / "iris_nb.npz"),
+                        help="Arquivo .npz exportado pelo train.py.")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="Linhas no teste de throughput.")
+    parser.add_argument("--atol", type=float, default=1e-9, help="Tolerância máxima nas probabilidades.")
+    args = parser.parse_args()
+
+    result = benchmark(args.model, args.compiled, batch_size=args.batch_size)
+    print(json.dumps(result, indent=2))
+    if result["max_abs_diff_proba"] > args.atol or not result["same_labels"]:
+        raise SystemExit(f"Divergência acima da tolerância ({args.atol}).")
+
+
+if __name__ == "__main__":
+    main()
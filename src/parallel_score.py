@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# Pontuação em lote multi-processo: o CSV é dividido em faixas de bytes (shards)
+import argparse
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from drift import DEFAULT_THRESHOLD, DriftMonitor
+from registry import default_model_path, model_token, resolve_model_path
+from scoring import iter_frame_features, load_model, predictions_frame, score_batch
+
+# Estado de cada processo do pool: o modelo é carregado uma vez por worker
+_WORKER = {}
+
+
+def plan_shards(csv_path: Path, n_shards: int):
+    """Divide o arquivo em faixas [início, fim) alinhadas em fim de linha.
+
+    Retorna (header_bytes, shards). Não trata campos entre aspas com quebra de
+    linha dentro (não ocorrem nos CSVs de medição).
+    """
+    size = csv_path.stat().st_size
+    with csv_path.open("rb") as fh:
+        header = fh.readline()
+        data_start = fh.tell()
+        step = max((size - data_start) // max(n_shards, 1), 1)
+        bounds = [data_start]
+        pos = data_start + step
+        while pos < size:
+            fh.seek(pos)
+            fh.readline()  # avança até o fim da linha corrente
+            cut = fh.tell()
+            if cut > bounds[-1]:
+                bounds.append(cut)
+            pos = max(cut, pos) + step
+    if bounds[-1] < size:
+        bounds.append(size)
+    shards = [(i, a, b) for i, (a, b) in enumerate(zip(bounds, bounds[1:]))]
+    return header, shards
+
+
+def _init_worker(model_path, prefer_compiled, csv_path, header, parts_dir, drift=False, chunksize=100_000):
+    clf, feature_columns, _, int_to_species = load_model(Path(model_path), prefer_compiled=prefer_compiled)
+    _WORKER.update(
+        clf=clf, feature_columns=feature_columns, int_to_species=int_to_species,
+        csv_path=csv_path, header=header, parts_dir=Path(parts_dir), drift=drift, chunksize=chunksize,
+    )
+
+
+def _empty_output(header, model_path, prefer_compiled):
+    """Cabeçalho da saída (colunas da entrada + predições) para um CSV sem linhas."""
+    clf, feature_columns, _, int_to_species = load_model(model_path, prefer_compiled=prefer_compiled)
+    df, _ = next(iter_frame_features([pd.read_csv(io.BytesIO(header))], feature_columns))
+    classes = np.asarray(clf.classes_)
+    out = predictions_frame(classes[:0], np.empty((0, len(classes))), classes, int_to_species)
+    return pd.concat([df, out], axis=1).to_csv(index=False).encode("utf-8")
+
+
+def _score_shard(shard):
+    idx, start, end = shard
+    t0 = time.perf_counter()
+    w = _WORKER
+    with open(w["csv_path"], "rb") as fh:
+        fh.seek(start)
+        raw = fh.read(end - start)
+    frames = pd.read_csv(io.BytesIO(w["header"] + raw), chunksize=w["chunksize"])
+    part = w["parts_dir"] / f"part-{idx:06d}.csv"
+    n_rows = 0
+    monitor = None
+    if w["drift"]:
+        # um monitor por shard; o processo principal junta os momentos (merge de Chan)
+        monitor = DriftMonitor(None)
+        monitor.bind("shard", w["clf"], w["feature_columns"], w["int_to_species"])
+    with part.open("w", encoding="utf-8", newline="") as fh:
+        header = True
+        for df, X in iter_frame_features(frames, w["feature_columns"]):
+            if not len(df):  # shard só com linhas em branco
+                continue
+            labels, proba = score_batch(w["clf"], X)
+            if monitor is not None:
+                monitor.update(X, labels)
+            out = predictions_frame(labels, proba, w["clf"].classes_, w["int_to_species"])
+            out.index = df.index
+            pd.concat([df, out], axis=1).to_csv(fh, header=header, index=False)
+            header = False
+            n_rows += len(df)
+    return idx, n_rows, time.perf_counter() - t0, os.getpid(), str(part), monitor and monitor.state()
+
+
+def score_parallel(input_path, output_path, model_path, workers=None, shard_mb=64.0, prefer_compiled=True,
+                   monitor=None, chunksize=100_000):
+    """Pontua o CSV em paralelo e grava a saída na mesma ordem da entrada.
+
+    Os shards são pontuados fora de ordem pelo pool, mas concatenados em ordem
+    (executor.map preserva a ordem de submissão) à medida que ficam prontos.
+    Com um drift.DriftMonitor, as estatísticas de cada shard são juntadas nele.
+    Cada shard é lido em chunks de chunksize linhas.
+    """
+    input_path, output_path = Path(input_path), Path(output_path)
+    if not input_path.exists():
+        raise FileNotFoundError(f"Arquivo de entrada não encontrado: {input_path}")
+    if input_path.suffix.lower() in (".parquet", ".pq"):
+        raise ValueError("O modo paralelo divide o arquivo por bytes: use CSV.")
+    # fixa a versão ativa agora: todos os workers pontuam com o mesmo modelo
+    model_path = resolve_model_path(model_path)
+    workers = workers or os.cpu_count() or 1
+    size = input_path.stat().st_size
+    # pelo menos 4 shards por worker para balancear; no máximo ~shard_mb cada
+    n_shards = max(workers * 4, math.ceil(size / (shard_mb * 2**20)))
+    header, shards = plan_shards(input_path, n_shards)
+    if monitor is not None:
+        clf, feature_columns, _, int_to_species = load_model(model_path, prefer_compiled=prefer_compiled)
+        monitor.bind(model_token(model_path), clf, feature_columns, int_to_species)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    per_worker = {}
+    total_rows = 0
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="iris_parts_", dir=output_path.parent) as parts_dir:
+        init_args = (str(model_path), prefer_compiled, str(input_path), header, parts_dir, monitor is not None,
+                     chunksize)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as ex, \
+                output_path.open("wb") as out:
+            first = True
+            for idx, n_rows, secs, pid, part, drift_state in ex.map(_score_shard, shards):
+                if drift_state is not None:
+                    monitor.merge(drift_state)
+                if n_rows:
+                    with open(part, "rb") as fh:
+                        if not first:
+                            fh.readline()  # cabeçalho só uma vez, vindo do 1º shard com linhas
+                        shutil.copyfileobj(fh, out, length=1 << 20)
+                    first = False
+                os.unlink(part)
+                total_rows += n_rows
+                w = per_worker.setdefault(pid, {"shards": 0, "rows": 0, "busy_seconds": 0.0})
+                w["shards"] += 1
+                w["rows"] += n_rows
+                w["busy_seconds"] += secs
+            if first:  # entrada só com o cabeçalho: a saída ainda traz as colunas
+                out.write(_empty_output(header, model_path, prefer_compiled))
+    elapsed = time.perf_counter() - t0
+
+    for w in per_worker.values():
+        w["rows_per_sec"] = w["rows"] / w["busy_seconds"] if w["busy_seconds"] > 0 else None
+    return {
+        "rows": total_rows,
+        "seconds": elapsed,
+        "rows_per_sec": total_rows / elapsed if elapsed > 0 else None,
+        "workers": workers,
+        "shards": len(shards),
+        "per_worker": {str(pid): w for pid, w in sorted(per_worker.items())},
+        "output": str(output_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pontuação em lote multi-processo com saída ordenada.")
+    parser.add_argument("--model", default=None,
+                        help="Arquivo .joblib do modelo ou diretório do registro "
+                             "(padrão: models/registry se existir, senão models/iris_nb.joblib).")
+    parser.add_argument("--input", required=True, help="CSV de entrada.")
+    parser.add_argument("--output", required=True, help="CSV de saída (mesma ordem da entrada).")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: todos os núcleos).")
+    parser.add_argument("--shard-mb", type=float, default=64.0,
+                        help="Tamanho máximo aproximado de cada shard em MB (padrão: 64).")
+    parser.add_argument("--sklearn", action="store_true",
+                        help="Força o .joblib (scikit-learn) mesmo havendo o artefato .npz compilado.")
+    parser.add_argument("--drift", default=None,
+                        help="Grava neste arquivo o resumo de drift das entradas pontuadas (JSON).")
+    parser.add_argument("--drift-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Deslocamento da média (em desvios-padrão do treino) que sinaliza drift (padrão: 0.5).")
+    args = parser.parse_args()
+    args.model = args.model or str(default_model_path())
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers deve ser positivo.")
+    if args.shard_mb <= 0:
+        parser.error("--shard-mb deve ser positivo.")
+
+    monitor = DriftMonitor(args.drift, threshold=args.drift_threshold) if args.drift else None
+    stats = score_parallel(args.input, args.output, args.model, workers=args.workers,
+                           shard_mb=args.shard_mb, prefer_compiled=not args.sklearn, monitor=monitor)
+    if monitor is not None:
+        summary = monitor.flush()
+        stats["drift"] = {"path": args.drift, "drift": summary["drift"], "alerts": summary["alerts"]}
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
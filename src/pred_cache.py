@@ -0,0 +1,106 @@
+# Cache LRU de predições, com chave no vetor de features quantizado
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """Memoiza predict_proba por vetor de features arredondado (ordem de feature_columns).
+
+    As medições vêm com resolução de 0.1 cm, então os mesmos vetores se repetem
+    muito. O arredondamento serve só de chave: num miss o modelo é avaliado na
+    linha original (a primeira com aquela chave), e entradas que diferem abaixo
+    de `decimals` casas reutilizam essa predição. Em lotes, as linhas com a mesma
+    chave são deduplicadas antes de chamar o modelo e o resultado é espalhado de
+    volta na ordem original.
+    """
+
+    def __init__(self, maxsize=10_000, decimals=1):
+        if maxsize <= 0:
+            raise ValueError("maxsize deve ser positivo.")
+        self.maxsize = int(maxsize)
+        self.decimals = int(decimals)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._token = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rows = 0
+
+    def bind(self, token):
+        """Associa o cache a uma versão do modelo; se mudou, descarta tudo."""
+        with self._lock:
+            if token != self._token:
+                self._data.clear()
+                self._token = token
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def score(self, clf, X):
+        """Mesmo contrato de scoring.score_batch: retorna (labels, proba)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        classes = np.asarray(clf.classes_)
+        if len(X) == 0:  # min()/max() abaixo não aceitam lote vazio
+            return classes[:0], np.empty((0, len(classes)))
+        # quantiza para inteiros (ex.: 5.1 -> 51): chave exata e sem o problema do -0.0
+        scale = 10.0 ** self.decimals
+        q = np.rint(X * scale).astype(np.int64)
+        lo = q.min(axis=0)
+        span = q.max(axis=0) - lo + 1
+        if np.prod(span.astype(np.float64)) < 2.0 ** 62:
+            # empacota cada linha num único int64: np.unique 1-D é bem mais rápido que axis=0
+            code = np.ravel_multi_index(tuple((q - lo).T), tuple(span))
+            _, first, inverse = np.unique(code, return_index=True, return_inverse=True)
+        else:
+            _, first, inverse = np.unique(q, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        uq = np.ascontiguousarray(q[first])
+
+        proba_u = np.empty((len(uq), len(classes)), dtype=np.float64)
+        keys = uq.view(np.dtype((np.void, uq.shape[1] * uq.itemsize))).ravel().tolist()
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._data.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._data.move_to_end(key)
+                    proba_u[i] = cached
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            self.rows += len(X)
+
+        if missing:
+            fresh = clf.predict_proba(X[first[missing]])  # linhas originais; o arredondado é só a chave
+            proba_u[missing] = fresh
+            with self._lock:
+                for i, row in zip(missing, fresh):
+                    self._data[keys[i]] = row
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+
+        proba = proba_u[inverse]
+        return classes[proba.argmax(axis=1)], proba
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "rows": self.rows,
+                "rows_deduplicated": self.rows - lookups,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "decimals": self.decimals,
+            }
@@ -0,0 +1,184 @@
+# Daemon de predição em socket Unix: mantém o modelo carregado entre chamadas da CLI
+import json
+import os
+import socket
+import socketserver
+import signal
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+from registry import ModelHolder
+
+# scoring (numpy) só é importado do lado do servidor: o cliente fica leve
+
+
+def default_socket_path() -> Path:
+    """$XDG_RUNTIME_DIR/iris_nb.sock ou <tmp>/iris_nb-<uid>/daemon.sock.
+
+    O segundo caso usa um diretório 0700 do usuário (criado pelo serve), nunca o
+    /tmp compartilhado diretamente.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and Path(runtime_dir).is_dir():
+        return Path(runtime_dir) / "iris_nb.sock"
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    return Path(tempfile.gettempdir()) / f"iris_nb-{uid}" / "daemon.sock"
+
+
+def _owned_by_me(st) -> bool:
+    return not hasattr(os, "getuid") or st.st_uid == os.getuid()
+
+
+def _prepare_socket_dir(directory: Path):
+    """Cria o diretório do socket (0700) ou confere que o existente é seguro.
+
+    Um diretório de outro usuário, ou com escrita para grupo/outros, permitiria
+    trocar o socket por um impostor.
+    """
+    try:
+        directory.mkdir(mode=0o700, parents=True)
+        return
+    except FileExistsError:
+        pass
+    st = directory.lstat()
+    if not stat.S_ISDIR(st.st_mode) or not _owned_by_me(st):
+        raise PermissionError(f"{directory} não é um diretório do usuário atual.")
+    if st.st_mode & 0o022 and not st.st_mode & stat.S_ISVTX:
+        raise PermissionError(f"{directory} tem escrita para grupo/outros; use um diretório privado (--socket).")
+
+
+def unix_sockets_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def handle_request(holder: ModelHolder, req: dict) -> dict:
+    op = req.get("op", "predict")
+    if op == "ping":
+        return {"ok": True, "model": str(holder.model_path)}
+    if op != "predict":
+        return {"ok": False, "error": f"Operação desconhecida: {op}", "type": "ValueError"}
+
+    if req.get("model") and Path(req["model"]).resolve() != holder.model_path:
+        return {"ok": False, "error": "O daemon serve outro modelo.", "type": "ModelMismatch"}
+
+    from scoring import score_batch, values_from_mapping
+
+    clf, feature_columns, species_to_int, int_to_species = holder.get()
+    try:
+        if "json" in req:
+            vals = values_from_mapping(req["json"], feature_columns)
+        else:
+            vals = [float(v) for v in req["values"]]
+            if len(vals) != len(feature_columns):
+                raise ValueError(f"Forneça exatamente {len(feature_columns)} valores.")
+    except (KeyError, ValueError, TypeError) as exc:
+        return {"ok": False, "error": str(exc.args[0]) if exc.args else str(exc), "type": type(exc).__name__}
+
+    labels, proba = score_batch(clf, [vals], cache=holder.cache)
+    if holder.monitor is not None:
+        holder.monitor.update([vals], labels)
+    y_pred = int(labels[0])
+    resp = {
+        "ok": True,
+        "input_values": vals,
+        "feature_columns": feature_columns,
+        "classes": [int(c) for c in clf.classes_],
+        "proba": [float(p) for p in proba[0]],
+        "int_to_species": {str(k): v for k, v in int_to_species.items()},
+        "pred_label": y_pred,
+        "pred_species": int_to_species[y_pred],
+    }
+    if holder.cache is not None:
+        resp["cache"] = holder.cache.stats()
+    return resp
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # uma requisição JSON por linha; a conexão pode mandar várias
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                resp = handle_request(self.server.holder, json.loads(line))
+            except Exception as exc:  # nunca derruba o daemon por causa de um cliente
+                resp = {"ok": False, "error": str(exc), "type": type(exc).__name__}
+            self.wfile.write(json.dumps(resp, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
+
+
+def serve(model_path: Path, socket_path: Path, prefer_compiled=True, cache=None, monitor=None):
+    """Sobe o daemon (bloqueante). Remove um socket órfão de execução anterior."""
+    if not unix_sockets_supported():
+        raise OSError("Sockets Unix não são suportados nesta plataforma.")
+    socket_path = Path(socket_path)
+    _prepare_socket_dir(socket_path.parent)
+    if socket_path.exists():
+        if not _owned_by_me(socket_path.lstat()):
+            raise PermissionError(f"{socket_path} pertence a outro usuário.")
+        if ping(socket_path):
+            raise OSError(f"Já existe um daemon ativo em {socket_path}")
+        socket_path.unlink()
+
+    # SIGTERM (kill) também passa pelo finally e remove o socket
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _exit_on_signal)
+
+    holder = ModelHolder(model_path, prefer_compiled=prefer_compiled, cache=cache, monitor=monitor)
+    holder.get()  # carrega já, para a 1ª requisição não pagar o custo
+
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), _Handler)
+    os.chmod(socket_path, 0o600)  # só o dono conecta
+    server.daemon_threads = True
+    server.holder = holder
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if monitor is not None:
+            monitor.flush()
+        try:
+            socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def request(socket_path: Path, payload: dict, timeout=2.0):
+    """Envia uma requisição ao daemon. Retorna None se ele não estiver rodando.
+
+    Só conecta a um socket do próprio usuário: as features nunca vão para um
+    processo de outro dono (a CLI então prediz localmente).
+    """
+    if not unix_sockets_supported():
+        return None
+    try:
+        st = os.lstat(socket_path)
+    except OSError:
+        return None
+    if not stat.S_ISSOCK(st.st_mode) or not _owned_by_me(st):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+            buf = b""
+            while not buf.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    return None
+                buf += chunk
+    except OSError:
+        return None
+    return json.loads(buf)
+
+
+def ping(socket_path: Path) -> bool:
+    resp = request(socket_path, {"op": "ping"}, timeout=0.5)
+    return bool(resp and resp.get("ok"))
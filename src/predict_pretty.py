@@ -1,36 +1,40 @@
 #!/usr/bin/env python3
 # Predição Iris com UX melhorada (tabelas, cores, validação e probabilidades)
+import time
+
+_T_START = time.perf_counter()
+
 import argparse
 import json
+import sys
 from pathlib import Path
 
-import joblib
-import numpy as np
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.prompt import Prompt
-from rich.align import Align
-
-console = Console()
-
-def load_bundle(model_path: Path):
-    if not model_path.exists():
-        raise FileNotFoundError(f"Modelo não encontrado: {model_path}. Rode antes: python src/train.py")
-    bundle = joblib.load(model_path)
-    clf = bundle["model"]
-    feature_columns = bundle["feature_columns"]
-    species_to_int = bundle["species_to_int"]
-    int_to_species = bundle["int_to_species"]
-    return clf, feature_columns, species_to_int, int_to_species
+import profiling
+from profiling import span
+
+# numpy, rich e o modelo são importados sob demanda: no modo --plain com o
+# artefato .npz a CLI não carrega rich nem scikit-learn, e quando a chamada é
+# encaminhada ao daemon nem o numpy é importado.
+
+_T_IMPORTS = time.perf_counter()
+
+_console = None
+
+def get_console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
 
 def ask_float(label: str) -> float:
+    from rich.prompt import Prompt
     while True:
         raw = Prompt.ask(f"[bold]{label}[/] (ex: 5.1)")
         try:
             return float(str(raw).strip().replace(",", "."))
         except ValueError:
-            console.print("[red]Valor inválido. Digite um número (use ponto ou vírgula).[/]")
+            get_console().print("[red]Valor inválido. Digite um número (use ponto ou vírgula).[/]")
 
 def parse_values_arg(values_str: str):
     parts = [p.strip() for p in values_str.split(",")]
@@ -42,18 +46,30 @@ def parse_values_arg(values_str: str):
     return vals
 
 def parse_json_arg(json_str: str, feature_columns):
-    obj = json.loads(json_str)
-    vals = []
-    for col in feature_columns:
-        # aceita chaves iguais (recomendado); se quiser, pode acrescentar aliases aqui
-        if col not in obj:
-            raise KeyError(f"Chave ausente no JSON para '{col}'")
-        vals.append(float(str(obj[col]).replace(",", ".")))
-    return vals
+    from scoring import values_from_mapping
+    return values_from_mapping(json.loads(json_str), feature_columns)
 
-def predict_pretty(arr, feature_columns, clf, int_to_species, show_probs=True):
-    X = np.array(arr, dtype=float).reshape(1, -1)
-    y_pred = int(clf.predict(X)[0])
+def plain_result(y_pred, classes, proba, int_to_species, show_probs=True):
+    result = {"pred_label": y_pred, "pred_species": int_to_species[y_pred]}
+    if show_probs:
+        result["probs"] = {int_to_species[int(c)]: float(p) for c, p in zip(classes, proba)}
+    return result
+
+def predict_plain(arr, clf, int_to_species, show_probs=True, cache=None):
+    """Predição sem rich: um único predict_proba, rótulo pelo argmax."""
+    from scoring import score_batch
+    with span("predict"):
+        labels, proba = score_batch(clf, [arr], cache=cache)
+    with span("render"):
+        return plain_result(int(labels[0]), clf.classes_, proba[0], int_to_species, show_probs)
+
+def render_pretty(arr, feature_columns, y_pred, classes, proba, int_to_species, show_probs=True):
+    """Painel, tabela de entradas e tabela de probabilidades (rich)."""
+    from rich.align import Align
+    from rich.panel import Panel
+    from rich.table import Table
+
+    console = get_console()
     species = int_to_species[y_pred]
 
     # Painel com o resultado principal
@@ -76,14 +92,8 @@ def predict_pretty(arr, feature_columns, clf, int_to_species, show_probs=True):
         t_inputs.add_row(c, str(v))
     console.print(t_inputs)
 
-    # Probabilidades por classe (GaussianNB tem predict_proba)
-    if show_probs and hasattr(clf, "predict_proba"):
-        proba = clf.predict_proba(X)[0]  # array na ordem interna das classes
-        # Precisamos descobrir a ordem das classes no modelo
-        # Em nosso treinamento, as classes são [1,2,3]; vamos garantir isso:
-        classes = getattr(clf, "classes_", None)
-        if classes is None:
-            classes = np.array(sorted(int_to_species.keys()))
+    # Probabilidades por classe, na ordem interna das classes do modelo
+    if show_probs and proba is not None:
         t_probs = Table(title="Probabilidade por classe", show_lines=True)
         t_probs.add_column("Classe", style="magenta")
         t_probs.add_column("Espécie", style="magenta")
@@ -95,39 +105,269 @@ def predict_pretty(arr, feature_columns, clf, int_to_species, show_probs=True):
 
     return {"pred_label": y_pred, "pred_species": species}
 
+def predict_pretty(arr, feature_columns, clf, int_to_species, show_probs=True, cache=None):
+    # GaussianNB tem predict_proba: uma chamada só, rótulo pelo argmax
+    from scoring import score_batch
+    with span("predict"):
+        labels, proba = score_batch(clf, [arr], cache=cache)
+    with span("render"):
+        return render_pretty(arr, feature_columns, int(labels[0]), clf.classes_, proba[0],
+                             int_to_species, show_probs=show_probs)
+
 def main():
     parser = argparse.ArgumentParser(description="Predição Iris (UX aprimorada com rich).")
-    parser.add_argument("--model", default=str(Path(__file__).resolve().parents[1] / "models" / "iris_nb.joblib"),
-                        help="Caminho do arquivo .joblib do modelo.")
+    parser.add_argument("--model", default=None,
+                        help="Arquivo .joblib do modelo ou diretório do registro "
+                             "(padrão: models/registry se existir, senão models/iris_nb.joblib).")
     group = parser.add_mutually_exclusive_group(required=False)
     group.add_argument("--values", help='Quatro valores CSV na ordem do modelo. Ex: "5.1,3.5,1.4,0.2"')
     group.add_argument("--json", help="JSON com chaves exatamente iguais à ordem das features.")
+    group.add_argument("--input", help="Arquivo CSV/Parquet para pontuação em lote (modo batch).")
+    group.add_argument("--stream", action="store_true",
+                       help="Lê JSON Lines ou linhas CSV do stdin até o EOF e escreve uma linha JSON por entrada.")
+    parser.add_argument("--output", help="CSV de saída com as predições do modo batch.")
+    parser.add_argument("--chunksize", type=int, default=100_000,
+                        help="Linhas por chunk no modo batch (padrão: 100000).")
+    parser.add_argument("--float32", action="store_true",
+                        help="Modo batch/--stream: lê e mantém as features em float32 (menos memória por chunk).")
+    parser.add_argument("--max-batch", type=int, default=256,
+                        help="Modo --stream: máximo de linhas por predict_proba (padrão: 256).")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="Modo --stream: espera máxima para completar um lote (padrão: 10 ms).")
+    parser.add_argument("--queue-size", type=int, default=4096,
+                        help="Modo --stream: linhas lidas à frente antes de parar de ler o stdin (padrão: 4096).")
     parser.add_argument("--no-probs", action="store_true", help="Não mostrar tabela de probabilidades.")
+    parser.add_argument("--plain", "--json-only", dest="plain", action="store_true",
+                        help="Saída só em JSON (uma linha), sem rich: caminho rápido para scripts.")
+    parser.add_argument("--sklearn", action="store_true",
+                        help="Força o .joblib (scikit-learn) mesmo havendo o artefato .npz compilado.")
+    parser.add_argument("--timing", action="store_true",
+                        help="Inclui no JSON os tempos de import (inclusive os adiados: numpy, joblib/sklearn), carga do modelo e predição (ms).")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Sobe o daemon: mantém o modelo carregado e escuta no socket Unix.")
+    parser.add_argument("--socket", default=None,
+                        help="Caminho do socket Unix do daemon (padrão: $XDG_RUNTIME_DIR/iris_nb.sock ou <tmp>/iris_nb-<uid>/daemon.sock).")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="Não encaminha --values/--json ao daemon; sempre carrega o modelo no processo.")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="Liga o cache LRU de predições com N entradas (padrão: 0 = desligado).")
+    parser.add_argument("--cache-decimals", type=int, default=1,
+                        help="Casas decimais da chave do cache: entradas iguais até essa precisão "
+                             "reutilizam a predição da primeira (padrão: 1 = 0.1 cm).")
+    parser.add_argument("--drift", default=None,
+                        help="Modos --input/--stream/--daemon: monitora drift das entradas e grava o resumo JSON aqui.")
+    # padrão None: drift.DEFAULT_THRESHOLD é resolvido no make_monitor (importar drift aqui puxaria o numpy)
+    parser.add_argument("--drift-threshold", type=float, default=None,
+                        help="Deslocamento da média (em desvios-padrão do treino) que sinaliza drift (padrão: 0.5).")
+    parser.add_argument("--drift-flush-seconds", type=float, default=30.0,
+                        help="Intervalo mínimo entre gravações do resumo de drift (padrão: 30 s).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Grava um trace JSON com tempo/memória por etapa (também via IRIS_PROFILE=1).")
+    parser.add_argument("--profile-dir", default=None,
+                        help="Diretório dos traces de --profile (padrão: profiles/).")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="Com --profile, também grava a saída do cProfile (.prof).")
     args = parser.parse_args()
+    if args.model is None:
+        from registry import default_model_path
+        args.model = str(default_model_path())
+
+    if args.input and not args.output:
+        parser.error("--input requer --output.")
+    if args.chunksize <= 0:
+        parser.error("--chunksize deve ser positivo.")
+    if args.plain and not (args.values or args.json or args.input or args.stream):
+        parser.error("--plain requer --values, --json, --input ou --stream.")
+    if args.daemon and (args.values or args.json or args.input or args.stream):
+        parser.error("--daemon não aceita --values/--json/--input/--stream.")
+    if args.max_batch <= 0 or args.queue_size <= 0:
+        parser.error("--max-batch e --queue-size devem ser positivos.")
+    if args.max_wait_ms < 0:
+        parser.error("--max-wait-ms não pode ser negativo.")
+    if args.cache_size < 0:
+        parser.error("--cache-size não pode ser negativo.")
+    if args.drift and not (args.input or args.stream or args.daemon):
+        parser.error("--drift vale para --input, --stream e --daemon.")
+
+    tracer = profiling.start("predict", enabled=args.profile, out_dir=args.profile_dir, cprofile=args.cprofile)
+    try:
+        run(args)
+    finally:
+        trace_path = profiling.stop(tracer)
+        if trace_path:
+            print(f"Trace de profiling salvo em: {trace_path}", file=sys.stderr)
+
+def make_monitor(args):
+    """DriftMonitor de --drift (None se desligado)."""
+    if not args.drift:
+        return None
+    from drift import DEFAULT_THRESHOLD, DriftMonitor
+    threshold = DEFAULT_THRESHOLD if args.drift_threshold is None else args.drift_threshold
+    return DriftMonitor(args.drift, threshold=threshold, flush_seconds=args.drift_flush_seconds)
 
-    console.print(Panel("[bold]Iris Classifier — Interface CLI Amigável[/]\n"
-                        "Preencha 4 valores ou use --values / --json.\n",
-                        border_style="blue"))
+def run_stream(args, cache):
+    """Modo --stream: stdout só com JSON Lines; o resumo final vai para o stderr."""
+    import os
+    from registry import ModelHolder
+    from stream_predict import stream_predict
 
-    clf, feature_columns, species_to_int, int_to_species = load_bundle(Path(args.model))
+    holder = ModelHolder(Path(args.model), prefer_compiled=not args.sklearn, cache=cache,
+                         monitor=make_monitor(args))
+    with span("load_model"):
+        holder.get()  # falha cedo se o modelo não existir
+    try:
+        stats = stream_predict(holder, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                               queue_size=args.queue_size, show_probs=not args.no_probs,
+                               dtype="float32" if args.float32 else "float64")
+    except BrokenPipeError:
+        # quem lia a saída fechou o pipe (ex.: | head): encerra sem traceback
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+    if holder.monitor is not None:
+        summary = holder.monitor.snapshot()
+        stats["drift"] = {"path": args.drift, "drift": summary["drift"], "alerts": summary["alerts"]}
+    print(json.dumps(stats, ensure_ascii=False), file=sys.stderr)
+
+def run(args):
+    cache = None
+    if args.cache_size:
+        from pred_cache import PredictionCache
+        cache = PredictionCache(maxsize=args.cache_size, decimals=args.cache_decimals)
+
+    if args.stream:
+        run_stream(args, cache)
+        return
+
+    if args.daemon or (args.values or args.json) and not args.no_daemon:
+        import predict_daemon as daemon
+        socket_path = Path(args.socket) if args.socket else daemon.default_socket_path()
+
+    if args.daemon:
+        print(f"Daemon de predição ouvindo em {socket_path} (Ctrl+C para parar)")
+        try:
+            daemon.serve(Path(args.model), socket_path, prefer_compiled=not args.sklearn, cache=cache,
+                         monitor=make_monitor(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Encaminha ao daemon se ele estiver rodando; senão, carrega o modelo aqui
+    forwarded = None
+    if (args.values or args.json) and not args.no_daemon:
+        payload = {"op": "predict", "model": args.model}
+        if args.values:
+            payload["values"] = parse_values_arg(args.values)
+        else:
+            payload["json"] = json.loads(args.json)
+        with span("daemon_request"):
+            forwarded = daemon.request(socket_path, payload)
+        if forwarded and not forwarded["ok"]:
+            if forwarded["type"] == "KeyError":
+                raise KeyError(forwarded["error"])
+            if forwarded["type"] in ("ValueError", "TypeError"):
+                raise ValueError(forwarded["error"])
+            forwarded = None  # ex.: daemon servindo outro modelo
+
+    if not args.plain:
+        from rich.panel import Panel
+        console = get_console()
+        console.print(Panel("[bold]Iris Classifier — Interface CLI Amigável[/]\n"
+                            "Preencha 4 valores ou use --values / --json.\n",
+                            border_style="blue"))
+
+    t_load = t_deferred = time.perf_counter()
+    if forwarded:
+        clf = None
+        feature_columns = forwarded["feature_columns"]
+        int_to_species = {int(k): v for k, v in forwarded["int_to_species"].items()}
+    else:
+        with span("imports"):  # numpy + backend do modelo (joblib/sklearn ou nb_numpy)
+            from scoring import model_loader
+            loader, model_path = model_loader(Path(args.model), prefer_compiled=not args.sklearn)
+        t_load = time.perf_counter()
+        with span("load_model"):
+            clf, feature_columns, species_to_int, int_to_species = loader(model_path)
+    t_loaded = time.perf_counter()
+
+    # Modo batch: um predict_proba vetorizado por chunk, sem tabelas por linha
+    if args.input:
+        from scoring import score_file
+        monitor = make_monitor(args)
+        if monitor is not None:
+            from registry import model_token
+            monitor.bind(model_token(Path(args.model)), clf, feature_columns, int_to_species)
+        stats = score_file(args.input, args.output, clf, feature_columns, int_to_species,
+                           chunksize=args.chunksize, cache=cache,
+                           dtype="float32" if args.float32 else "float64", monitor=monitor)
+        if monitor is not None:
+            summary = monitor.flush()
+            stats["drift"] = {"path": args.drift, "drift": summary["drift"], "alerts": summary["alerts"]}
+        if args.plain:
+            print(json.dumps(stats, ensure_ascii=False))
+            return
+        console.print(Panel.fit(
+            f"[bold]Linhas:[/] {stats['rows']}\n"
+            f"[bold]Tempo:[/] {stats['seconds']:.3f} s\n"
+            f"[bold]Throughput:[/] {stats['rows_per_sec']:,.0f} linhas/s\n"
+            f"[bold]Saída:[/] {stats['output']}"
+            + (f"\n[bold]Cache:[/] {stats['cache']['hits']} hits / {stats['cache']['misses']} misses, "
+               f"{stats['cache']['rows_deduplicated']} linhas deduplicadas" if cache else "")
+            + (f"\n[bold]Drift:[/] {'[red]SIM[/] — ' + '; '.join(stats['drift']['alerts'][:3]) if stats['drift']['drift'] else 'não'}"
+               f" ({stats['drift']['path']})" if "drift" in stats else ""),
+            title="Batch", border_style="green"))
+        return
 
     # Se nada passado, modo interativo
-    if not args.values and not args.json:
+    if forwarded:
+        vals = forwarded["input_values"]
+    elif not args.values and not args.json:
         console.print("[bold]Ordem das features:[/] " + ", ".join(feature_columns))
         vals = [ask_float(c) for c in feature_columns]
-    elif args.values:
-        vals = parse_values_arg(args.values)
     else:
-        vals = parse_json_arg(args.json, feature_columns)
+        with span("parse"):
+            if args.values:
+                vals = parse_values_arg(args.values)
+            else:
+                vals = parse_json_arg(args.json, feature_columns)
 
-    result = predict_pretty(vals, feature_columns, clf, int_to_species, show_probs=not args.no_probs)
+    show_probs = not args.no_probs
+    if forwarded:
+        vals = forwarded["input_values"]
+        y_pred, classes, proba = forwarded["pred_label"], forwarded["classes"], forwarded["proba"]
+        with span("render"):
+            if args.plain:
+                result = plain_result(y_pred, classes, proba, int_to_species, show_probs)
+            else:
+                result = render_pretty(vals, feature_columns, y_pred, classes, proba, int_to_species, show_probs)
+    elif args.plain:
+        result = predict_plain(vals, clf, int_to_species, show_probs=show_probs, cache=cache)
+    else:
+        result = predict_pretty(vals, feature_columns, clf, int_to_species, show_probs=show_probs, cache=cache)
+    t_done = time.perf_counter()
 
-    # Também imprime um JSON final (útil para testes automatizados)
-    console.print(Panel.fit(json.dumps({
+    output = {
         "input_order": feature_columns,
         "input_values": vals,
         **result
-    }, ensure_ascii=False, indent=2), title="Saída JSON", border_style="cyan"))
+    }
+    if forwarded and "cache" in forwarded:
+        output["cache"] = forwarded["cache"]
+    elif cache is not None:
+        output["cache"] = cache.stats()
+    if args.timing:
+        output["timing_ms"] = {
+            "imports": (_T_IMPORTS - _T_START + t_load - t_deferred) * 1000.0,
+            "load_model": (t_loaded - t_load) * 1000.0,
+            "predict": (t_done - t_loaded) * 1000.0,
+            "total": (t_done - _T_START) * 1000.0,
+            "model_backend": "daemon" if forwarded else type(clf).__module__.split(".")[0],
+        }
+    if args.plain:
+        print(json.dumps(output, ensure_ascii=False))
+        return
+
+    # Também imprime um JSON final (útil para testes automatizados)
+    console.print(Panel.fit(json.dumps(output, ensure_ascii=False, indent=2), title="Saída JSON", border_style="cyan"))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,225 @@
+# Instrumentação leve: spans com tempo e memória, trace JSON e cProfile opcional
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Liga por variável de ambiente (além das flags --profile das CLIs):
+#   IRIS_PROFILE=1            grava o trace JSON
+#   IRIS_PROFILE_DIR=...      onde gravar (padrão: <raiz>/profiles)
+#   IRIS_PROFILE_CPROFILE=1   também roda o cProfile (.prof ao lado do trace)
+#   IRIS_PROFILE_MEMORY=1     liga o tracemalloc (memória Python por span; mais lento)
+ENV_VAR = "IRIS_PROFILE"
+DEFAULT_DIR = Path(__file__).resolve().parents[1] / "profiles"
+
+_ENABLED = False  # atalho: com tudo desligado, span() é um if + retorno
+_GLOBAL = None
+_LOCAL = threading.local()
+_SEQ = itertools.count(1)  # vários traces no mesmo segundo (ex.: reruns do Streamlit)
+
+
+def _env_flag(name) -> bool:
+    return os.environ.get(name, "").strip().lower() not in ("", "0", "false", "no")
+
+
+def _rss_bytes():
+    """RSS atual do processo (Linux: /proc/self/statm); None se indisponível."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "parent", "depth", "t0", "rss0", "py0")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Anexa atributos descobertos durante o span (ex.: número de linhas)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+        self.rss0 = _rss_bytes()
+        self.py0 = self.tracer._py_current()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        t1 = time.perf_counter()
+        tracer = self.tracer
+        tracer._stack().pop()
+        rss1 = _rss_bytes()
+        rec = {
+            "name": self.name,
+            "parent": self.parent,
+            "depth": self.depth,
+            "start_ms": (self.t0 - tracer.t0) * 1000.0,
+            "duration_ms": (t1 - self.t0) * 1000.0,
+            "rss_delta_bytes": rss1 - self.rss0 if rss1 is not None and self.rss0 is not None else None,
+        }
+        py1 = tracer._py_current()
+        if py1 is not None and self.py0 is not None:
+            rec["py_alloc_delta_bytes"] = py1 - self.py0
+        if exc_type is not None:
+            rec["error"] = exc_type.__name__
+        if self.attrs:
+            rec["attrs"] = self.attrs
+        with tracer._lock:
+            tracer.spans.append(rec)
+        return False
+
+
+class Tracer:
+    """Coleta spans aninhados (tempo de parede + delta de RSS) e grava um trace JSON."""
+
+    def __init__(self, name, out_dir=None, cprofile=False, memory=False):
+        self.name = name
+        self.out_dir = Path(out_dir) if out_dir else DEFAULT_DIR
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tracemalloc = None
+        if memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._tracemalloc = tracemalloc
+        self._profiler = None
+        if cprofile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        self.t0 = time.perf_counter()
+        self.rss0 = _rss_bytes()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _py_current(self):
+        return self._tracemalloc.get_traced_memory()[0] if self._tracemalloc else None
+
+    def span(self, name, attrs=None):
+        return _Span(self, name, dict(attrs) if attrs else {})
+
+    def summary(self):
+        """Total por nome de span (spans repetidos, ex.: por chunk, somados)."""
+        out = {}
+        for rec in self.spans:
+            s = out.setdefault(rec["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += 1
+            s["total_ms"] += rec["duration_ms"]
+            s["max_ms"] = max(s["max_ms"], rec["duration_ms"])
+        return dict(sorted(out.items(), key=lambda kv: -kv[1]["total_ms"]))
+
+    def dump(self, path=None):
+        """Para o cProfile (se ligado) e grava o trace; retorna o caminho do JSON."""
+        total_ms = (time.perf_counter() - self.t0) * 1000.0
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = self.out_dir / f"{self.name}-{stamp}-{os.getpid()}-{next(_SEQ)}.json"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rss1 = _rss_bytes()
+        trace = {
+            "name": self.name,
+            "started_at": self.started_at,
+            "argv": sys.argv,
+            "total_ms": total_ms,
+            "rss_start_bytes": self.rss0,
+            "rss_end_bytes": rss1,
+            "summary": self.summary(),
+            "spans": sorted(self.spans, key=lambda r: r["start_ms"]),
+        }
+        if self._tracemalloc:
+            trace["py_peak_bytes"] = self._tracemalloc.get_traced_memory()[1]
+        if self._profiler is not None:
+            self._profiler.disable()
+            prof_path = path.with_suffix(".prof")
+            self._profiler.dump_stats(prof_path)
+            trace["cprofile"] = str(prof_path)  # abrir com: python -m pstats <arquivo>
+        path.write_text(json.dumps(trace, indent=2, ensure_ascii=False), encoding="utf-8")
+        return path
+
+
+def start(name, enabled=False, out_dir=None, cprofile=False, memory=False, thread_local=False):
+    """Liga a instrumentação se enabled ou IRIS_PROFILE estiver setado; senão retorna None.
+
+    thread_local=True associa o tracer só à thread atual (ex.: cada execução do
+    script do Streamlit, que roda uma sessão por thread).
+    """
+    global _ENABLED, _GLOBAL
+    if not (enabled or _env_flag(ENV_VAR)):
+        return None
+    tracer = Tracer(
+        name,
+        out_dir=out_dir or os.environ.get("IRIS_PROFILE_DIR"),
+        cprofile=cprofile or _env_flag("IRIS_PROFILE_CPROFILE"),
+        memory=memory or _env_flag("IRIS_PROFILE_MEMORY"),
+    )
+    if thread_local:
+        _LOCAL.tracer = tracer
+    else:
+        _GLOBAL = tracer
+    _ENABLED = True
+    return tracer
+
+
+def stop(tracer, path=None):
+    """Grava o trace e desliga o tracer; retorna o caminho do JSON (ou None)."""
+    global _GLOBAL
+    if tracer is None:
+        return None
+    if getattr(_LOCAL, "tracer", None) is tracer:
+        _LOCAL.tracer = None
+    if _GLOBAL is tracer:
+        _GLOBAL = None
+    return tracer.dump(path)
+
+
+def current():
+    """Tracer ativo para a thread atual (ou o global), se houver."""
+    if not _ENABLED:
+        return None
+    return getattr(_LOCAL, "tracer", None) or _GLOBAL
+
+
+def span(name, **attrs):
+    """Context manager que mede o trecho; custo ~nulo com a instrumentação desligada."""
+    if not _ENABLED:
+        return _NULL_SPAN
+    tracer = getattr(_LOCAL, "tracer", None) or _GLOBAL
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, attrs)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# Registro versionado de modelos: um diretório por hash de conteúdo + manifest com a versão ativa
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# só stdlib aqui: o cliente do daemon e a CLI --plain importam este módulo
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_REGISTRY = ROOT / "models" / "registry"
+LEGACY_MODEL = ROOT / "models" / "iris_nb.joblib"
+MANIFEST = "manifest.json"
+MANIFEST_LOCK = "manifest.lock"
+
+# nome dentro do diretório da versão; só os três primeiros entram no hash
+MODEL_FILE = "model.joblib"
+COMPILED_FILE = "model.npz"
+MAPPING_FILE = "species_mapping.json"
+METRICS_FILE = "metrics.json"
+HASHED_FILES = (MODEL_FILE, COMPILED_FILE, MAPPING_FILE)
+
+
+@contextlib.contextmanager
+def atomic_path(path: Path):
+    """Entrega um caminho temporário no mesmo diretório; no fim, os.replace para o destino.
+
+    Quem lê o destino vê o arquivo antigo ou o novo inteiro, nunca um meio-escrito.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.stem}.tmp-{os.getpid()}{path.suffix}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def atomic_write_text(path: Path, text: str):
+    with atomic_path(path) as tmp:
+        tmp.write_text(text, encoding="utf-8")
+
+
+def is_registry(path) -> bool:
+    path = Path(path)
+    return path.is_dir() and (path / MANIFEST).exists()
+
+
+def default_model_path() -> Path:
+    """Registro, se já existir um; senão o .joblib avulso do train.py."""
+    return DEFAULT_REGISTRY if is_registry(DEFAULT_REGISTRY) else LEGACY_MODEL
+
+
+@contextlib.contextmanager
+def manifest_lock(registry_dir: Path):
+    """Lock exclusivo (entre processos e threads) para ler-modificar-gravar o manifest."""
+    registry_dir = Path(registry_dir)
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    fd = os.open(registry_dir / MANIFEST_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def read_manifest(registry_dir: Path) -> dict:
+    try:
+        return json.loads((Path(registry_dir) / MANIFEST).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {"active": None, "history": []}
+
+
+def active_version(registry_dir: Path):
+    return read_manifest(registry_dir).get("active")
+
+
+def version_dir(registry_dir: Path, version=None) -> Path:
+    registry_dir = Path(registry_dir)
+    version = version or active_version(registry_dir)
+    if not version:
+        raise FileNotFoundError(f"Nenhuma versão ativa em {registry_dir}. Rode antes: python src/train.py")
+    path = registry_dir / "versions" / version
+    if not path.is_dir():
+        raise FileNotFoundError(f"Versão {version} não existe em {registry_dir}")
+    return path
+
+
+def resolve_model_path(model_path: Path) -> Path:
+    """Diretório do registro → .joblib da versão ativa; arquivo → ele mesmo."""
+    model_path = Path(model_path)
+    if is_registry(model_path):
+        return version_dir(model_path) / MODEL_FILE
+    return model_path
+
+
+def artifact_path(model_path: Path, name: str) -> Path:
+    """Artefato irmão do modelo (ex.: metrics.json) na versão ativa ou ao lado do .joblib."""
+    model_path = Path(model_path)
+    if is_registry(model_path):
+        return version_dir(model_path) / name
+    return model_path.with_name(name)
+
+
+def content_hash(files: dict) -> str:
+    h = hashlib.sha256()
+    for name in HASHED_FILES:
+        if name in files:
+            h.update(name.encode("utf-8") + b"\0")
+            with Path(files[name]).open("rb") as fh:
+                for block in iter(lambda: fh.read(1 << 20), b""):
+                    h.update(block)
+    return h.hexdigest()[:16]
+
+
+def publish(files: dict, registry_dir: Path = DEFAULT_REGISTRY, promote_now=True, info=None) -> str:
+    """Copia os artefatos para versions/<hash>/ e (por padrão) promove a versão.
+
+    files: {MODEL_FILE: caminho, COMPILED_FILE: ..., ...}. O diretório é montado
+    num staging e renomeado de uma vez; numa versão já existente (mesmo conteúdo)
+    só os arquivos fora do hash (metrics.json) são atualizados.
+    """
+    if MODEL_FILE not in files:
+        raise ValueError(f"publish precisa de {MODEL_FILE}")
+    registry_dir = Path(registry_dir)
+    versions = registry_dir / "versions"
+    versions.mkdir(parents=True, exist_ok=True)
+    version = content_hash(files)
+    target = versions / version
+    if not target.exists():
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=versions))
+        try:
+            for name, src in files.items():
+                shutil.copy2(src, staging / name)
+            os.rename(staging, target)
+        except OSError:
+            if not target.exists():
+                raise
+            # outro processo publicou o mesmo conteúdo primeiro
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging)
+    else:
+        for name, src in files.items():
+            if name not in HASHED_FILES:
+                with atomic_path(target / name) as tmp:
+                    shutil.copy2(src, tmp)
+    if promote_now:
+        promote(registry_dir, version, info)
+    return version
+
+
+def promote(registry_dir: Path, version: str, info=None):
+    """Troca a versão ativa reescrevendo o manifest com os.replace (atômico)."""
+    registry_dir = Path(registry_dir)
+    version_dir(registry_dir, version)  # valida
+    with manifest_lock(registry_dir):
+        return _promote_locked(registry_dir, read_manifest(registry_dir), version, info)
+
+
+def _promote_locked(registry_dir: Path, manifest: dict, version: str, info=None):
+    manifest["previous"] = manifest.get("active")
+    manifest["active"] = version
+    manifest.setdefault("history", []).append(
+        {"version": version, "promoted_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), **(info or {})}
+    )
+    atomic_write_text(registry_dir / MANIFEST, json.dumps(manifest, indent=2, ensure_ascii=False))
+    return version
+
+
+def rollback(registry_dir: Path):
+    """Volta para a versão ativa anterior (a última diferente da atual no histórico)."""
+    registry_dir = Path(registry_dir)
+    with manifest_lock(registry_dir):
+        manifest = read_manifest(registry_dir)
+        current = manifest.get("active")
+        for entry in reversed(manifest.get("history", [])):
+            if entry["version"] != current:
+                version_dir(registry_dir, entry["version"])  # valida
+                return _promote_locked(registry_dir, manifest, entry["version"], {"rollback_from": current})
+    raise ValueError("Não há versão anterior para voltar.")
+
+
+def list_versions(registry_dir: Path):
+    registry_dir = Path(registry_dir)
+    active = active_version(registry_dir)
+    out = []
+    for path in sorted((registry_dir / "versions").glob("[!.]*"), key=lambda p: p.stat().st_mtime):
+        meta = {}
+        metrics = path / METRICS_FILE
+        if metrics.exists():
+            m = json.loads(metrics.read_text(encoding="utf-8"))
+            meta = {"accuracy": m.get("accuracy"), "model_version": m.get("model_version")}
+        out.append({"version": path.name, "active": path.name == active, **meta})
+    return out
+
+
+def model_token(model_path: Path):
+    """Identidade da versão servida: muda quando outra versão é promovida/gravada.
+
+    Registro: (diretório, versão ativa). Arquivo avulso: (mtime_ns, tamanho) do
+    .joblib e do .npz.
+    """
+    model_path = Path(model_path)
+    if is_registry(model_path):
+        return (str(model_path.resolve()), active_version(model_path))
+    token = [str(model_path.resolve())]
+    for p in (model_path, model_path.with_suffix(".npz")):
+        try:
+            st = p.stat()
+            token.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            token.append(None)
+    return tuple(token)
+
+
+def token_fields(token) -> dict:
+    """model_token em campos JSON legíveis (para resumos e /health).
+
+    Registro: model_path + model_version (hash da versão ativa). Arquivo avulso:
+    model_path + mtime_ns/tamanho do .joblib e do .npz.
+    """
+    if isinstance(token, tuple) and len(token) == 2:
+        return {"model_path": token[0], "model_version": token[1]}
+    if isinstance(token, tuple) and len(token) == 3:
+        path, model_stat, compiled_stat = token
+        return {
+            "model_path": path,
+            "model_version": None,
+            "model_mtime_ns": model_stat[0] if model_stat else None,
+            "model_size": model_stat[1] if model_stat else None,
+            "compiled_mtime_ns": compiled_stat[0] if compiled_stat else None,
+        }
+    return {"model_path": None, "model_version": None if token is None else str(token)}
+
+
+class ModelHolder:
+    """Modelo carregado uma vez; recarrega sozinho quando outra versão entra no ar.
+
+    Serve tanto para o registro (segue o manifest) quanto para um .joblib avulso
+    (segue mtime/tamanho). A checagem por chamada é um stat/leitura do manifest.
+    O cache de predições e o monitor de drift (drift.DriftMonitor) opcionais são
+    religados à nova versão a cada recarga.
+    """
+
+    def __init__(self, model_path: Path, prefer_compiled=True, cache=None, monitor=None):
+        self.model_path = Path(model_path).resolve()
+        self.prefer_compiled = prefer_compiled
+        self.cache = cache
+        self.monitor = monitor
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def get(self):
+        from scoring import load_model
+
+        version = model_token(self.model_path)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._loaded = load_model(self.model_path, prefer_compiled=self.prefer_compiled)
+                    self._version = version
+                    if self.cache is not None:
+                        self.cache.bind(version)
+                    if self.monitor is not None:
+                        clf, feature_columns, _, int_to_species = self._loaded
+                        self.monitor.bind(version, clf, feature_columns, int_to_species)
+        return self._loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro versionado de modelos (listar, promover, voltar).")
+    parser.add_argument("--registry", default=str(DEFAULT_REGISTRY), help="Diretório do registro.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="Lista as versões (a ativa marcada com *).")
+    p_promote = sub.add_parser("promote", help="Ativa uma versão existente.")
+    p_promote.add_argument("version")
+    sub.add_parser("rollback", help="Volta para a versão ativa anterior.")
+    args = parser.parse_args()
+
+    registry_dir = Path(args.registry)
+    if args.cmd == "list":
+        for v in list_versions(registry_dir):
+            acc = f"  accuracy={v['accuracy']:.4f}" if v.get("accuracy") is not None else ""
+            print(f"{'*' if v['active'] else ' '} {v['version']}{acc}")
+    elif args.cmd == "promote":
+        print(f"Versão ativa: {promote(registry_dir, args.version, {'source': 'manual'})}")
+    else:
+        print(f"Versão ativa: {rollback(registry_dir)}")
+
+
+if __name__ == "__main__":
+    main()
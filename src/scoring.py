@@ -0,0 +1,211 @@
+# Pontuação em lote (CSV/Parquet em chunks, um predict_proba vetorizado por chunk)
+import time
+from pathlib import Path
+
+import numpy as np
+
+from profiling import span
+from registry import resolve_model_path
+from utils import resolve_feature_columns
+
+
+def load_bundle(model_path: Path, mmap=True):
+    """Carrega o bundle .joblib (ou a versão ativa, se model_path for o registro).
+
+    Com mmap=True os arrays vêm via memory-map (joblib grava sem compressão), então
+    vários processos lendo a mesma versão compartilham as páginas do arquivo.
+    """
+    model_path = resolve_model_path(model_path)
+    if not model_path.exists():
+        raise FileNotFoundError(f"Modelo não encontrado: {model_path}. Rode antes: python src/train.py")
+    import joblib  # adiado: puxa o scikit-learn inteiro
+
+    bundle = joblib.load(model_path, mmap_mode="r" if mmap else None)
+    clf = bundle["model"]
+    feature_columns = bundle["feature_columns"]
+    species_to_int = bundle["species_to_int"]
+    int_to_species = bundle["int_to_species"]
+    return clf, feature_columns, species_to_int, int_to_species
+
+
+def model_loader(model_path: Path, prefer_compiled=True):
+    """Escolhe o loader que o load_model usaria e importa o backend dele.
+
+    Retorna (loader, caminho). Separado do load_model para a CLI medir os imports
+    adiados (joblib/scikit-learn ou nb_numpy) à parte da carga do arquivo.
+    """
+    model_path = resolve_model_path(model_path)
+    compiled = model_path.with_suffix(".npz")
+    if model_path.name.endswith(".lut.npz"):
+        from lookup_table import load_lookup
+        return load_lookup, model_path
+    if model_path.suffix == ".npz":
+        from nb_numpy import load_compiled
+        return load_compiled, model_path
+    if prefer_compiled and compiled.exists() and (
+        not model_path.exists() or compiled.stat().st_mtime_ns >= model_path.stat().st_mtime_ns
+    ):
+        from nb_numpy import load_compiled
+        return load_compiled, compiled
+    import joblib  # noqa: F401  (o load_bundle importaria no primeiro uso)
+    import sklearn.naive_bayes  # noqa: F401  (o unpickle do bundle importaria de qualquer jeito)
+    return load_bundle, model_path
+
+
+def load_model(model_path: Path, prefer_compiled=True):
+    """Carrega o modelo preferindo o artefato .npz (NumPy puro, sem sklearn).
+
+    O .npz ao lado do .joblib só é usado se não for mais antigo que ele (o
+    train.py grava os dois); caso contrário cai no load_bundle. Aceita o
+    diretório do registro (usa a versão ativa) e as tabelas do lookup_table.py
+    (arquivo .lut.npz).
+    """
+    loader, path = model_loader(model_path, prefer_compiled)
+    return loader(path)
+
+
+def values_from_mapping(obj, feature_columns):
+    """Extrai os valores de um dict na ordem do modelo (aceita vírgula decimal)."""
+    vals = []
+    for col in feature_columns:
+        # aceita chaves iguais (recomendado); se quiser, pode acrescentar aliases aqui
+        if col not in obj:
+            raise KeyError(f"Chave ausente no JSON para '{col}'")
+        vals.append(float(str(obj[col]).replace(",", ".")))
+    return vals
+
+
+def check_finite(X):
+    """Levanta ValueError se X tiver NaN/inf; devolve X para encadear.
+
+    float() aceita "nan" e "inf" (e o json aceita NaN/Infinity), e o predict_proba
+    devolveria probabilidades NaN sem erro nenhum.
+    """
+    bad = ~np.isfinite(X).all(axis=1)
+    if bad.any():
+        rows = np.flatnonzero(bad)
+        raise ValueError(f"Valores não finitos (NaN/inf) em {len(rows)} linha(s): {rows[:10].tolist()}")
+    return X
+
+
+def score_batch(clf, X, cache=None):
+    """Uma única chamada a predict_proba; o rótulo sai do argmax (sem 2º passe).
+
+    Com um PredictionCache, linhas repetidas/já vistas não voltam ao modelo.
+    """
+    if cache is not None:
+        with span("predict_proba", cache=True):
+            return cache.score(clf, X)
+    with span("predict_proba"):
+        proba = clf.predict_proba(X)
+    labels = np.asarray(clf.classes_)[proba.argmax(axis=1)]
+    return labels, proba
+
+
+def _iter_frames(path: Path, chunksize: int, dtype=None):
+    import pandas as pd  # adiado: só o modo batch precisa do pandas
+
+    suffix = path.suffix.lower()
+    if suffix in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Leitura de Parquet requer o pacote 'pyarrow' (pip install pyarrow).") from exc
+        pf = pq.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+
+
+def iter_feature_chunks(path, feature_columns, chunksize=100_000, dtype=np.float64):
+    """Lê o arquivo em chunks e devolve (df_chunk, X) com X na ordem do modelo.
+
+    Os cabeçalhos do arquivo são mapeados com resolve_feature_columns, então
+    aceita os mesmos sinônimos do treino (sepal.length, sepal length (cm), ...).
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Arquivo de entrada não encontrado: {path}")
+    csv_dtypes = None
+    if np.dtype(dtype) == np.float32 and path.suffix.lower() not in (".parquet", ".pq"):
+        # faz o parse direto em float32: nenhum chunk float64 intermediário
+        import pandas as pd
+
+        header = pd.read_csv(path, nrows=0)
+        csv_dtypes = {c: np.float32 for c in resolve_feature_columns(header)}
+    yield from iter_frame_features(_iter_frames(path, chunksize, csv_dtypes), feature_columns, dtype)
+
+
+def iter_frame_features(frames, feature_columns, dtype=np.float64):
+    """Igual a iter_feature_chunks, mas sobre um iterável de DataFrames já lidos
+    (ex.: pd.read_csv(buffer, chunksize=...) de um upload)."""
+    src_cols = None
+    for df in frames:
+        if src_cols is None:
+            # resolve_feature_columns devolve na ordem canônica, a mesma do treino
+            src_cols = resolve_feature_columns(df)
+            if len(src_cols) != len(feature_columns):
+                raise ValueError(
+                    f"Arquivo tem {len(src_cols)} features; o modelo espera {len(feature_columns)}."
+                )
+        X = df[src_cols].to_numpy(dtype=dtype)
+        yield df, X
+
+
+def predictions_frame(labels, proba, classes, int_to_species):
+    """Monta o DataFrame de saída (rótulo, espécie e probabilidade por classe)."""
+    import pandas as pd
+
+    out = pd.DataFrame({
+        "pred_label": labels.astype(int),
+        "pred_species": pd.Categorical.from_codes(
+            np.searchsorted(classes, labels),
+            [int_to_species[int(c)] for c in classes],
+        ),
+    })
+    for j, cls in enumerate(classes):
+        out[f"prob_{int_to_species[int(cls)]}"] = proba[:, j]
+    return out
+
+
+def score_file(input_path, output_path, clf, feature_columns, int_to_species, chunksize=100_000,
+               cache=None, dtype=np.float64, monitor=None):
+    """Pontua o arquivo inteiro em chunks e grava um CSV de predições.
+
+    Com dtype=np.float32 as features são lidas e mantidas em float32 (metade da
+    memória por chunk); as probabilidades continuam em float64. Com um
+    drift.DriftMonitor, cada chunk entra nas estatísticas de drift. Retorna um
+    dicionário com linhas, segundos e linhas/s.
+    """
+    import pandas as pd
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    classes = np.asarray(clf.classes_)
+
+    n_rows = 0
+    t0 = time.perf_counter()
+    with output_path.open("w", encoding="utf-8", newline="") as fh:
+        header = True
+        for df, X in iter_feature_chunks(input_path, feature_columns, chunksize, dtype):
+            labels, proba = score_batch(clf, X, cache=cache)
+            if monitor is not None:
+                monitor.update(X, labels)
+            out = predictions_frame(labels, proba, classes, int_to_species)
+            out.index = df.index
+            with span("write_output", rows=len(df)):
+                pd.concat([df, out], axis=1).to_csv(fh, header=header, index=False)
+            header = False
+            n_rows += len(df)
+    elapsed = time.perf_counter() - t0
+
+    stats = {
+        "rows": n_rows,
+        "seconds": elapsed,
+        "rows_per_sec": n_rows / elapsed if elapsed > 0 else float("inf"),
+        "output": str(output_path),
+    }
+    if cache is not None:
+        stats["cache"] = cache.stats()
+    return stats
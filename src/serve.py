@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# Serviço HTTP local de predição com micro-batching (stdlib, sem frameworks)
+import argparse
+import json
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from drift import DEFAULT_THRESHOLD, DriftMonitor
+from pred_cache import PredictionCache
+from registry import ModelHolder, default_model_path, token_fields
+from scoring import check_finite, score_batch, values_from_mapping
+
+
+class ServiceStats:
+    """Latência (janela das últimas N requisições) e histograma de tamanho de lote."""
+
+    def __init__(self, window=10_000):
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=window)
+        self._batch_hist = {}
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+
+    def record_request(self, latency_ms, n_rows):
+        with self._lock:
+            self._latencies_ms.append(latency_ms)
+            self.requests += 1
+            self.rows += n_rows
+
+    def record_batch(self, n_rows):
+        # buckets em potências de 2: 1, 2, 4, 8, ...
+        bucket = 1 << max(n_rows - 1, 0).bit_length()
+        with self._lock:
+            self._batch_hist[bucket] = self._batch_hist.get(bucket, 0) + 1
+            self.batches += 1
+
+    def snapshot(self):
+        with self._lock:
+            lat = np.fromiter(self._latencies_ms, dtype=float)
+            hist = dict(sorted(self._batch_hist.items()))
+            out = {"requests": self.requests, "rows": self.rows, "batches": self.batches}
+        if lat.size:
+            p50, p90, p99 = np.percentile(lat, [50, 90, 99])
+            out["latency_ms"] = {"p50": p50, "p90": p90, "p99": p99, "max": float(lat.max()), "window": int(lat.size)}
+        else:
+            out["latency_ms"] = None
+        out["mean_batch_rows"] = self.rows / self.batches if self.batches else None
+        out["batch_rows_histogram"] = {f"<={k}": v for k, v in hist.items()}
+        return out
+
+
+class _Pending:
+    __slots__ = ("X", "done", "labels", "proba", "error")
+
+    def __init__(self, X):
+        self.X = X
+        self.done = threading.Event()
+        self.labels = None
+        self.proba = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Junta requisições concorrentes num único predict_proba.
+
+    O lote fecha quando atinge max_batch linhas ou quando max_wait_ms se passa
+    desde a primeira requisição do lote, o que vier primeiro.
+    """
+
+    def __init__(self, holder, max_batch=256, max_wait_ms=2.0, stats=None):
+        self.holder = holder  # registry.ModelHolder: troca de versão sem reiniciar
+        self.cache = holder.cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = stats or ServiceStats()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, X):
+        item = _Pending(X)
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.labels, item.proba
+
+    def _collect(self):
+        items = [self._queue.get()]
+        n_rows = len(items[0].X)
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            items.append(item)
+            n_rows += len(item.X)
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                X = items[0].X if len(items) == 1 else np.vstack([it.X for it in items])
+                clf = self.holder.get()[0]
+                labels, proba = score_batch(clf, X, cache=self.cache)
+                if self.holder.monitor is not None:
+                    self.holder.monitor.update(X, labels)
+            except Exception as exc:  # devolve o erro para cada requisição do lote
+                for it in items:
+                    it.error = exc
+                    it.done.set()
+                continue
+            self.stats.record_batch(len(X))
+            start = 0
+            for it in items:
+                stop = start + len(it.X)
+                it.labels, it.proba = labels[start:stop], proba[start:stop]
+                it.done.set()
+                start = stop
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer com backlog de conexões configurável.
+
+    O padrão do socketserver (request_queue_size=5) recusa conexões já com ~16
+    clientes simultâneos (ConnectionResetError); 128 absorve as rajadas.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, backlog=128):
+        self.request_queue_size = backlog  # lido no listen() dentro do __init__
+        super().__init__(server_address, handler_class)
+
+
+def make_handler(batcher):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # silencioso: o log por requisição custa caro
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                try:
+                    feature_columns = batcher.holder.get()[1]
+                except Exception as exc:  # modelo ilegível (ex.: versão promovida corrompida)
+                    self._send_json(500, {"status": "error", "error": str(exc)})
+                    return
+                self._send_json(200, {"status": "ok", "feature_columns": feature_columns,
+                                      **token_fields(batcher.holder.version)})
+            elif self.path == "/stats":
+                snap = batcher.stats.snapshot()
+                if batcher.cache is not None:
+                    snap["cache"] = batcher.cache.stats()
+                self._send_json(200, snap)
+            elif self.path == "/drift":
+                monitor = batcher.holder.monitor
+                if monitor is None:
+                    self._send_json(404, {"error": "Monitor de drift desligado (use --drift ARQUIVO)."})
+                else:
+                    self._send_json(200, monitor.snapshot())
+            else:
+                self._send_json(404, {"error": f"Rota desconhecida: {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": f"Rota desconhecida: {self.path}"})
+                return
+            t0 = time.perf_counter()
+            try:
+                clf, feature_columns, _, int_to_species = batcher.holder.get()
+                class_names = [int_to_species[int(c)] for c in clf.classes_]
+            except Exception as exc:
+                self._send_json(500, {"error": str(exc)})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"null")
+                # aceita um objeto, uma lista de objetos ou {"instances": [...]}
+                if isinstance(body, dict) and "instances" in body:
+                    body = body["instances"]
+                rows = body if isinstance(body, list) else [body]
+                if not rows:
+                    raise ValueError("Nenhuma instância enviada.")
+                X = check_finite(np.array([values_from_mapping(r, feature_columns) for r in rows], dtype=float))
+            except (ValueError, KeyError, TypeError) as exc:
+                self._send_json(400, {"error": str(exc.args[0]) if exc.args else str(exc)})
+                return
+
+            try:
+                labels, proba = batcher.submit(X)
+            except Exception as exc:
+                self._send_json(500, {"error": str(exc)})
+                return
+
+            preds = [
+                {
+                    "pred_label": int(lbl),
+                    "pred_species": int_to_species[int(lbl)],
+                    "proba": dict(zip(class_names, map(float, p))),
+                }
+                for lbl, p in zip(labels, proba)
+            ]
+            self._send_json(200, {"predictions": preds})
+            batcher.stats.record_request((time.perf_counter() - t0) * 1000.0, len(X))
+
+    return Handler
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP de predição Iris com micro-batching.")
+    parser.add_argument("--model", default=None,
+                        help="Arquivo .joblib do modelo ou diretório do registro "
+                             "(padrão: models/registry se existir, senão models/iris_nb.joblib).")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (padrão: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8000, help="Porta (padrão: 8000).")
+    parser.add_argument("--backlog", type=int, default=128,
+                        help="Fila de conexões pendentes do socket (listen backlog; padrão: 128).")
+    parser.add_argument("--max-batch", type=int, default=256,
+                        help="Máximo de linhas por lote de predict_proba (padrão: 256).")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0,
+                        help="Janela de espera para juntar requisições, em ms (padrão: 2).")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="Liga o cache LRU de predições com N entradas (padrão: 0 = desligado).")
+    parser.add_argument("--cache-decimals", type=int, default=1,
+                        help="Casas decimais da chave do cache: entradas iguais até essa precisão "
+                             "reutilizam a predição da primeira (padrão: 1 = 0.1 cm).")
+    parser.add_argument("--drift", default=None,
+                        help="Liga o monitor de drift e grava o resumo JSON neste arquivo (também em GET /drift).")
+    parser.add_argument("--drift-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Deslocamento da média (em desvios-padrão do treino) que sinaliza drift (padrão: 0.5).")
+    parser.add_argument("--drift-flush-seconds", type=float, default=30.0,
+                        help="Intervalo mínimo entre gravações do resumo de drift (padrão: 30 s).")
+    args = parser.parse_args()
+
+    cache = PredictionCache(args.cache_size, args.cache_decimals) if args.cache_size > 0 else None
+    monitor = None
+    if args.drift:
+        monitor = DriftMonitor(args.drift, threshold=args.drift_threshold, flush_seconds=args.drift_flush_seconds)
+    # sklearn por padrão (como antes); recarrega ao promover outra versão no registro
+    holder = ModelHolder(Path(args.model or default_model_path()), prefer_compiled=False, cache=cache,
+                         monitor=monitor)
+    holder.get()
+    batcher = MicroBatcher(holder, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    server = PredictionServer((args.host, args.port), make_handler(batcher), backlog=args.backlog)
+    # SIGTERM (kill) também passa pelo finally e grava o último resumo de drift
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    print(f"Servindo em http://{args.host}:{args.port}  (POST /predict, GET /stats, GET /health, GET /drift)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if monitor is not None:
+            monitor.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# Predição contínua: JSON Lines/CSV no stdin → JSON Lines no stdout, em micro-lotes (asyncio)
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+from profiling import span
+from scoring import score_batch, values_from_mapping
+from utils import resolve_feature_columns
+
+LINE_LIMIT = 1 << 20  # maior linha aceita pelo StreamReader (1 MiB)
+_EOF = object()
+
+
+class LineParser:
+    """Converte uma linha do stdin nos valores na ordem do modelo.
+
+    Linhas que começam com "{" são JSON (mesmas chaves do --json). As demais são
+    CSV: sem cabeçalho, os valores vêm na ordem do modelo (como no --values); se
+    a primeira linha CSV não for numérica, ela é tratada como cabeçalho e as
+    colunas são mapeadas pelos mesmos sinônimos do treino.
+    """
+
+    def __init__(self, feature_columns):
+        self.feature_columns = list(feature_columns)
+        self._header = None
+        self._header_cols = None
+        self._seen_csv = False
+
+    def parse(self, line: str):
+        """Retorna (valores, id) — id vem da chave "id" do JSON, se houver — ou None para cabeçalho."""
+        if line.startswith("{"):
+            obj = json.loads(line)
+            if not isinstance(obj, dict):
+                raise ValueError("Cada linha JSON deve ser um objeto.")
+            return values_from_mapping(obj, self.feature_columns), obj.get("id")
+
+        parts = [p.strip() for p in line.split(",")]
+        if not self._seen_csv:
+            if not all(_is_number(p) for p in parts):
+                # resolve antes de guardar: uma primeira linha inválida vira erro só dela,
+                # e a próxima linha CSV ainda pode ser o cabeçalho (ou dados sem cabeçalho)
+                header_cols = resolve_feature_columns(SimpleNamespace(columns=parts))
+                self._header, self._header_cols = parts, header_cols
+                self._seen_csv = True
+                return None
+            self._seen_csv = True
+        if self._header is not None:
+            if len(parts) != len(self._header):
+                raise ValueError(f"Linha com {len(parts)} campos; o cabeçalho tem {len(self._header)}.")
+            return values_from_mapping(dict(zip(self._header, parts)), self._header_cols), None
+        if len(parts) != len(self.feature_columns):
+            raise ValueError(f"Forneça exatamente {len(self.feature_columns)} valores separados por vírgula.")
+        return values_from_mapping(dict(zip(self.feature_columns, parts)), self.feature_columns), None
+
+
+def _is_number(s: str) -> bool:
+    try:
+        float(s.replace(",", "."))
+        return True
+    except ValueError:
+        return False
+
+
+def _error_record(lineno, exc):
+    return {"line": lineno, "ok": False, "error": str(exc.args[0]) if exc.args else str(exc),
+            "type": type(exc).__name__}
+
+
+class StreamStats:
+    def __init__(self):
+        self.rows = 0
+        self.errors = 0
+        self.batches = 0
+        self.t0 = time.perf_counter()
+
+    def snapshot(self, cache=None):
+        elapsed = time.perf_counter() - self.t0
+        out = {
+            "rows": self.rows,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch_rows": self.rows / self.batches if self.batches else None,
+            "seconds": elapsed,
+            "rows_per_sec": self.rows / elapsed if elapsed > 0 else float("inf"),
+        }
+        if cache is not None:
+            out["cache"] = cache.stats()
+        return out
+
+
+class StreamScorer:
+    """Parse + um score_batch + serialização de um lote de linhas, na ordem de entrada.
+
+    Roda numa thread própria (uma só, então os lotes saem na ordem em que
+    entraram) enquanto o event loop continua lendo o stdin.
+    """
+
+    def __init__(self, holder, out, show_probs=True, dtype=np.float64, stats=None):
+        self.holder = holder  # registry.ModelHolder: segue a versão ativa entre lotes
+        self.out = out
+        self.show_probs = show_probs
+        self.dtype = dtype
+        self.stats = stats or StreamStats()
+        self._parser = None
+        self._columns = None
+
+    def process(self, batch):
+        clf, feature_columns, _, int_to_species = self.holder.get()
+        if self._columns != feature_columns:
+            self._parser = LineParser(feature_columns)
+            self._columns = feature_columns
+
+        records = [None] * len(batch)
+        rows, where, ids = [], [], []
+        with span("parse", rows=len(batch)):
+            for i, (lineno, raw) in enumerate(batch):
+                try:
+                    if raw is None:
+                        raise ValueError(f"Linha maior que o limite de {LINE_LIMIT} bytes.")
+                    parsed = self._parser.parse(raw.decode("utf-8").strip())
+                    if parsed is None:  # cabeçalho CSV
+                        continue
+                    values = np.asarray(parsed[0], dtype=self.dtype)
+                    if not np.isfinite(values).all():  # "nan"/"inf" (ou overflow no float32)
+                        raise ValueError("Valores não finitos (NaN/inf) na linha.")
+                except (KeyError, ValueError, TypeError, UnicodeDecodeError) as exc:
+                    records[i] = _error_record(lineno, exc)
+                    continue
+                rows.append(values)
+                ids.append(parsed[1])
+                where.append(i)
+
+        if rows:
+            X = np.stack(rows)
+            try:
+                labels, proba = score_batch(clf, X, cache=self.holder.cache)
+            except Exception as exc:  # um lote ruim vira erro nas suas linhas, o stream segue
+                for i in where:
+                    records[i] = _error_record(batch[i][0], exc)
+                rows = []
+            else:
+                if self.holder.monitor is not None:
+                    self.holder.monitor.update(X, labels)
+        if rows:
+            with span("render", rows=len(rows)):
+                names = [int_to_species[int(c)] for c in clf.classes_]
+                for j, i in enumerate(where):
+                    label = int(labels[j])
+                    rec = {"line": batch[i][0], "ok": True}
+                    if ids[j] is not None:
+                        rec["id"] = ids[j]
+                    rec["pred_label"] = label
+                    rec["pred_species"] = int_to_species[label]
+                    if self.show_probs:
+                        rec["probs"] = dict(zip(names, proba[j].tolist()))
+                    records[i] = rec
+
+        with span("write_output", rows=len(batch)):
+            lines = [json.dumps(r, ensure_ascii=False) for r in records if r is not None]
+            if lines:
+                self.out.write(("\n".join(lines) + "\n").encode("utf-8"))
+                self.out.flush()
+        self.stats.rows += len(rows)
+        self.stats.errors += sum(1 for r in records if r is not None and not r["ok"])
+        self.stats.batches += 1
+
+
+async def _open_stdin(stdin):
+    """readline assíncrono do stdin.
+
+    Pipe/socket/terminal: StreamReader via connect_read_pipe (o buffer limitado
+    pausa a leitura quando enche). Arquivo comum redirecionado (< arquivo) ou
+    plataforma sem suporte: readline bloqueante numa thread.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=LINE_LIMIT)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stdin)
+    except (ValueError, OSError, NotImplementedError):
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stdin")
+        return lambda: loop.run_in_executor(pool, stdin.readline)
+    return reader.readline
+
+
+async def _read_lines(readline, queue):
+    lineno = 0
+    while True:
+        try:
+            line = await readline()
+        except ValueError:  # linha acima de LINE_LIMIT: vira um registro de erro
+            lineno += 1
+            await queue.put((lineno, None))
+            continue
+        if not line:
+            break
+        lineno += 1
+        if line.strip():
+            await queue.put((lineno, line))  # fila cheia → para de ler (backpressure)
+    await queue.put(_EOF)
+
+
+async def _next_batch(queue, max_batch, max_wait):
+    """Espera a primeira linha e fecha o lote em max_batch linhas ou max_wait segundos.
+
+    Retorna (lote, eof).
+    """
+    loop = asyncio.get_running_loop()
+    item = await queue.get()
+    if item is _EOF:
+        return [], True
+    batch = [item]
+    deadline = loop.time() + max_wait
+    while len(batch) < max_batch:
+        try:
+            item = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            # asyncio.wait em vez de wait_for: no timeout não se perde um item já retirado
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=timeout)
+            if not done:
+                getter.cancel()
+                break
+            item = getter.result()
+        if item is _EOF:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+async def _stream(holder, stdin, stdout, max_batch, max_wait_ms, queue_size, show_probs, dtype, stats):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    readline = await _open_stdin(stdin)
+    reader = asyncio.ensure_future(_read_lines(readline, queue))
+    scorer = StreamScorer(holder, stdout, show_probs=show_probs, dtype=dtype, stats=stats)
+    worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-score")
+    pending = None  # no máximo um lote em processamento enquanto o próximo é montado
+    try:
+        while True:
+            batch, eof = await _next_batch(queue, max_batch, max_wait_ms / 1000.0)
+            if pending is not None:
+                await pending
+                pending = None
+            if batch:
+                pending = loop.run_in_executor(worker, scorer.process, batch)
+            if eof:
+                break
+        if pending is not None:
+            await pending
+        await reader
+    finally:
+        reader.cancel()
+        worker.shutdown(wait=True)
+
+
+def stream_predict(holder, stdin=None, stdout=None, max_batch=256, max_wait_ms=10.0, queue_size=4096,
+                   show_probs=True, dtype=np.float64):
+    """Lê linhas do stdin até EOF e escreve uma linha JSON por entrada no stdout.
+
+    Memória constante: no máximo queue_size linhas na fila, um lote sendo
+    montado e outro sendo pontuado. Retorna o resumo (linhas, erros, lotes, linhas/s).
+    """
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    stats = StreamStats()
+    try:
+        asyncio.run(_stream(holder, stdin, stdout, max_batch, max_wait_ms, queue_size, show_probs, dtype, stats))
+    finally:
+        if holder.monitor is not None:
+            holder.monitor.flush()
+    return stats.snapshot(holder.cache)
@@ -1,22 +1,283 @@
 import argparse
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import joblib
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import RepeatedStratifiedKFold, train_test_split
 from sklearn.naive_bayes import GaussianNB
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.metrics import accuracy_score
 
+from data_cache import load_typed_csv, tail_digest
+from evaluation import ConfusionAccumulator, format_report
+from nb_numpy import export_compiled
+import profiling
+from profiling import span
+from registry import (
+    COMPILED_FILE,
+    DEFAULT_REGISTRY,
+    MAPPING_FILE,
+    METRICS_FILE,
+    MODEL_FILE,
+    atomic_path,
+    atomic_write_text,
+    publish,
+)
 from utils import (
     SPECIES_TO_INT,
     INT_TO_SPECIES,
-    normalize_species_name,
+    encode_species,
+    find_species_column,
     resolve_feature_columns,
 )
 
 
+def hash_test_mask(row_ids, test_size=0.2, seed=42):
+    """Split determinístico por hash do id da linha (True = teste).
+
+    Não depende da ordem nem do tamanho total do arquivo, então o 80/20 é
+    reprodutível sem materializar o dataset inteiro.
+    """
+    # hash_key só vale para object/str: ids numéricos viram texto para a semente contar
+    key = f"{seed:016d}"[-16:]
+    ids = np.asarray(row_ids).astype(str).astype(object)
+    h = pd.util.hash_array(ids, hash_key=key, categorize=False)
+    return (h % np.uint64(10_000)) < np.uint64(int(round(test_size * 10_000)))
+
+
+def iter_labeled_chunks(csv_path: Path, chunksize: int, id_column=None):
+    """Itera o CSV em chunks devolvendo (X, y, row_ids) já com rótulos 1/2/3."""
+    cols = None
+    offset = 0
+    reader = pd.read_csv(csv_path, chunksize=chunksize)
+    while True:
+        with span("csv_read"):
+            df = next(reader, None)
+        if df is None:
+            break
+        if cols is None:
+            species_col = find_species_column(df.columns)
+            with span("resolve_feature_columns"):
+                cols = resolve_feature_columns(df)
+        with span("label_mapping"):
+            y = encode_species(df[species_col]).to_numpy(dtype=int)
+        X = df[cols].to_numpy(dtype=float)
+        if id_column:
+            row_ids = df[id_column].to_numpy()
+        else:
+            row_ids = np.arange(offset, offset + len(df), dtype=np.int64)
+        offset += len(df)
+        yield cols, X, y, row_ids
+
+
+class GaussianStats:
+    """Contagem, média e M2 por classe, acumulados bloco a bloco (fórmula de Chan).
+
+    Guarda só a variância crua: o epsilon de var_smoothing entra uma vez, em
+    to_model(), calculado com a variância de todo o treino, como no fit() de uma
+    vez. (O partial_fit do sklearn soma e subtrai o epsilon de cada bloco na
+    variância acumulada, e com var_smoothing alto o erro passa de 1e-3.)
+    """
+
+    def __init__(self, classes, n_features):
+        self.classes = np.asarray(classes)
+        self.count = np.zeros(len(self.classes), dtype=np.float64)
+        self.mean = np.zeros((len(self.classes), n_features), dtype=np.float64)
+        self.m2 = np.zeros((len(self.classes), n_features), dtype=np.float64)
+
+    @classmethod
+    def from_model(cls, clf):
+        """Estatísticas de um GaussianNB já treinado (var_ - epsilon_ é a variância crua)."""
+        stats = cls(clf.classes_, clf.theta_.shape[1])
+        stats.count = np.asarray(clf.class_count_, dtype=np.float64).copy()
+        stats.mean = np.asarray(clf.theta_, dtype=np.float64).copy()
+        stats.m2 = (np.asarray(clf.var_, dtype=np.float64) - clf.epsilon_) * stats.count[:, None]
+        return stats
+
+    def update(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        pos = np.searchsorted(self.classes, y)
+        for c in np.unique(pos):
+            Xc = X[pos == c]
+            n_b = len(Xc)
+            mean_b = Xc.mean(axis=0)
+            m2_b = ((Xc - mean_b) ** 2).sum(axis=0)
+            n_a = self.count[c]
+            n = n_a + n_b
+            delta = mean_b - self.mean[c]
+            self.mean[c] += delta * (n_b / n)
+            self.m2[c] += m2_b + delta ** 2 * (n_a * n_b / n)
+            self.count[c] = n
+        return self
+
+    def to_model(self, var_smoothing=1e-9):
+        """GaussianNB com os mesmos atributos que o fit() de uma vez produziria."""
+        n = self.count.sum()
+        if n == 0:
+            raise ValueError("Nenhuma linha de treino encontrada no CSV.")
+        total_mean = self.count @ self.mean / n
+        total_var = (self.m2 + self.count[:, None] * (self.mean - total_mean) ** 2).sum(axis=0) / n
+        epsilon = var_smoothing * float(total_var.max())
+        with np.errstate(invalid="ignore", divide="ignore"):
+            raw_var = np.where(self.count[:, None] > 0, self.m2 / self.count[:, None], 0.0)
+
+        clf = GaussianNB(var_smoothing=var_smoothing)
+        clf.classes_ = self.classes.copy()
+        clf.class_count_ = self.count.copy()
+        clf.class_prior_ = self.count / n
+        clf.theta_ = self.mean.copy()
+        clf.var_ = raw_var + epsilon
+        clf.epsilon_ = epsilon
+        clf.n_features_in_ = self.mean.shape[1]
+        return clf
+
+
+def train_streaming(csv_path: Path, chunksize: int, id_column=None, test_size=0.2, seed=42,
+                    var_smoothing=1e-9):
+    """Treino out-of-core do GaussianNB (memória limitada ao chunk).
+
+    1º passe: estatísticas por classe (GaussianStats) nas linhas de treino de cada chunk.
+    2º passe: predição das linhas de teste com o modelo final, acumulada direto
+    na matriz de confusão (y_test/y_pred não ficam em memória).
+    """
+    classes = np.array(sorted(INT_TO_SPECIES.keys()))
+    stats = None
+    cols = None
+    n_rows = 0
+    for cols, X, y, row_ids in iter_labeled_chunks(csv_path, chunksize, id_column):
+        n_rows += len(y)
+        if stats is None:
+            stats = GaussianStats(classes, X.shape[1])
+        with span("split"):
+            train_mask = ~hash_test_mask(row_ids, test_size, seed)
+        if train_mask.any():
+            with span("fit", rows=int(train_mask.sum())):
+                stats.update(X[train_mask], y[train_mask])
+    if stats is None:
+        raise ValueError("Nenhuma linha de treino encontrada no CSV.")
+    clf = stats.to_model(var_smoothing)
+
+    evaluator = ConfusionAccumulator(classes)
+    for _, X, y, row_ids in iter_labeled_chunks(csv_path, chunksize, id_column):
+        with span("split"):
+            test_mask = hash_test_mask(row_ids, test_size, seed)
+        if test_mask.any():
+            with span("predict_test", rows=int(test_mask.sum())):
+                y_pred = clf.predict(X[test_mask])
+            with span("metrics"):
+                evaluator.update(y[test_mask], y_pred)
+    return clf, cols, evaluator, n_rows
+
+
+def index_split(n_rows, test_size=0.2, seed=42):
+    """Mesmas linhas do train_test_split(X, y, shuffle=True), mas só com índices.
+
+    Os índices voltam ordenados: o acesso a X (possivelmente um memory-map) fica
+    sequencial e nenhum X_train/X_test é materializado.
+    """
+    train_idx, test_idx = train_test_split(
+        np.arange(n_rows), test_size=test_size, shuffle=True, random_state=seed
+    )
+    return np.sort(train_idx), np.sort(test_idx)
+
+
+def fit_float32(X, y, train_idx, var_smoothing=1e-9, chunk_rows=65_536):
+    """GaussianNB sobre X float32 sem cópia float64 do conjunto inteiro.
+
+    Cada bloco de linhas vira float64 só para acumular as estatísticas por
+    classe (GaussianStats), então médias e variâncias acumulam em float64 e o
+    epsilon de var_smoothing sai da variância de todo o treino, igual ao fit().
+    """
+    stats = GaussianStats(np.unique(y[train_idx]), X.shape[1])
+    for start in range(0, len(train_idx), chunk_rows):
+        idx = train_idx[start:start + chunk_rows]
+        stats.update(X[idx], y[idx])
+    return stats.to_model(var_smoothing)
+
+
+def predict_rows(clf, X, idx, chunk_rows=65_536):
+    """clf.predict nas linhas idx de X, em blocos (sem materializar X[idx] inteiro)."""
+    out = np.empty(len(idx), dtype=np.asarray(clf.classes_).dtype)
+    for start in range(0, len(idx), chunk_rows):
+        block = idx[start:start + chunk_rows]
+        out[start:start + len(block)] = clf.predict(X[block])
+    return out
+
+
+def training_state(csv_path: Path, csv_size: int, n_rows: int, split_info: dict, var_smoothing: float):
+    """O que o update.py precisa para incorporar só as linhas anexadas depois."""
+    return {
+        "csv": str(csv_path.resolve()),
+        "bytes_seen": csv_size,
+        "tail_sha256": tail_digest(csv_path, csv_size),
+        "rows_seen": n_rows,
+        "split_method": split_info["split_method"],
+        "id_column": split_info.get("id_column"),
+        "test_size": 0.2,
+        "random_state": 42,
+        "var_smoothing": var_smoothing,
+    }
+
+
+# Estado de cada processo do pool: dados e splits ficam no worker (enviados uma vez)
+_CV_STATE = {}
+
+
+def _cv_init(X, y, n_splits, n_repeats, seed):
+    rskf = RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats, random_state=seed)
+    _CV_STATE["X"] = X
+    _CV_STATE["y"] = y
+    _CV_STATE["splits"] = list(rskf.split(X, y))
+
+
+def _cv_fold(task):
+    var_smoothing, split_no = task
+    X, y = _CV_STATE["X"], _CV_STATE["y"]
+    train_idx, test_idx = _CV_STATE["splits"][split_no]
+    t0 = time.perf_counter()
+    clf = GaussianNB(var_smoothing=var_smoothing).fit(X[train_idx], y[train_idx])
+    acc = float(accuracy_score(y[test_idx], clf.predict(X[test_idx])))
+    return var_smoothing, split_no, acc, time.perf_counter() - t0
+
+
+def cross_validate_grid(X, y, grid, n_splits, n_repeats, jobs=1, seed=42):
+    """K-fold estratificado repetido × grade de var_smoothing, em paralelo.
+
+    Cada tarefa (config, fold) roda num processo do pool; retorna média/desvio
+    por config e o tempo de parede de cada fold.
+    """
+    n_folds = n_splits * n_repeats
+    tasks = [(vs, i) for vs in grid for i in range(n_folds)]
+    init_args = (X, y, n_splits, n_repeats, seed)
+    if jobs == 1:
+        _cv_init(*init_args)
+        results = [_cv_fold(t) for t in tasks]
+    else:
+        workers = os.cpu_count() if jobs <= 0 else jobs
+        with ProcessPoolExecutor(max_workers=workers, initializer=_cv_init, initargs=init_args) as ex:
+            results = list(ex.map(_cv_fold, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+    per_config = []
+    for vs in grid:
+        rows = [r for r in results if r[0] == vs]
+        accs = np.array([r[2] for r in rows])
+        per_config.append({
+            "var_smoothing": vs,
+            "mean_accuracy": float(accs.mean()),
+            "std_accuracy": float(accs.std(ddof=1)) if len(accs) > 1 else 0.0,
+            "folds": [
+                {"repeat": i // n_splits, "fold": i % n_splits, "accuracy": acc, "seconds": secs}
+                for _, i, acc, secs in rows
+            ],
+        })
+    best = max(per_config, key=lambda c: (c["mean_accuracy"], -c["std_accuracy"]))
+    return per_config, best
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Treino Iris com GaussianNB (80/20, shuffle=True) usando Series.replace."
@@ -43,77 +304,240 @@ def main():
         default=str(Path(__file__).resolve().parents[1] / "models" / "metrics.json"),
         help="Arquivo JSON de métricas.",
     )
+    parser.add_argument(
+        "--compiled-out",
+        default=str(Path(__file__).resolve().parents[1] / "models" / "iris_nb.npz"),
+        help="Artefato .npz para inferência em NumPy puro (sem sklearn).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Treino out-of-core: lê o CSV em chunks e acumula as estatísticas do GaussianNB por chunk.",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=100_000,
+        help="Linhas por chunk no modo --stream (padrão: 100000).",
+    )
+    parser.add_argument(
+        "--id-column",
+        default=None,
+        help="Coluna de id usada no split por hash do modo --stream (padrão: número da linha).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Diretório do cache binário do CSV (padrão: <pasta do CSV>/.cache).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Sempre faz o parse do CSV (não usa nem grava o cache binário).",
+    )
+    parser.add_argument(
+        "--cv",
+        type=int,
+        default=0,
+        help="K do K-fold estratificado repetido sobre o treino (0 = desligado).",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=1,
+        help="Repetições do K-fold no modo --cv (padrão: 1).",
+    )
+    parser.add_argument(
+        "--var-smoothing",
+        default="1e-9",
+        help='Grade de var_smoothing separada por vírgula. Ex: "1e-11,1e-9,1e-7" (padrão: 1e-9).',
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Processos para o --cv (padrão: 1; 0 ou negativo = todos os núcleos).",
+    )
+    parser.add_argument(
+        "--float32",
+        action="store_true",
+        help="Features em float32 do loader tipado até o fit, split por índices e "
+             "estatísticas do modelo em float64 (menos memória em CSVs grandes).",
+    )
+    parser.add_argument(
+        "--registry",
+        default=str(DEFAULT_REGISTRY),
+        help="Registro versionado onde o modelo é publicado e promovido (padrão: models/registry).",
+    )
+    parser.add_argument(
+        "--no-registry",
+        action="store_true",
+        help="Só grava os arquivos avulsos (--model-out etc.), sem publicar no registro.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Grava um trace JSON com tempo/memória por etapa (também via IRIS_PROFILE=1).",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        help="Diretório dos traces de --profile (padrão: profiles/).",
+    )
+    parser.add_argument(
+        "--cprofile",
+        action="store_true",
+        help="Com --profile, também grava a saída do cProfile (.prof) ao lado do trace.",
+    )
     args = parser.parse_args()
 
     csv_path = Path(args.csv)
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV não encontrado: {csv_path}")
+    if args.chunksize <= 0:
+        parser.error("--chunksize deve ser positivo.")
+    try:
+        grid = [float(v) for v in args.var_smoothing.split(",") if v.strip()]
+    except ValueError:
+        parser.error("--var-smoothing deve ser uma lista de números separados por vírgula.")
+    if not grid:
+        parser.error("--var-smoothing não pode ser vazio.")
+    if args.cv and args.cv < 2:
+        parser.error("--cv deve ser >= 2.")
+    if args.cv and args.stream:
+        parser.error("--cv não é suportado junto com --stream.")
+    if args.float32 and args.stream:
+        parser.error("--float32 vale para o treino em memória; o --stream já limita a memória ao chunk.")
+    tracer = profiling.start("train", enabled=args.profile, out_dir=args.profile_dir, cprofile=args.cprofile)
+    try:
+        train(args, csv_path, grid)
+    finally:
+        trace_path = profiling.stop(tracer)
+        if trace_path:
+            print(f"Trace de profiling salvo em: {trace_path}")
 
-    df = pd.read_csv(csv_path)
 
-    if "species" not in df.columns:
-        for c in df.columns:
-            if c.lower().strip() in ("species", "target", "class", "variety", "label"):
-                df = df.rename(columns={c: "species"})
-                break
-    if "species" not in df.columns:
-        raise KeyError("Coluna 'species' não encontrada no CSV.")
+def train(args, csv_path: Path, grid):
+    var_smoothing = grid[0]
+    cv_info = None
 
-    df["species"] = df["species"].map(normalize_species_name)
-    bad = set(df["species"].unique()) - set(SPECIES_TO_INT.keys())
-    if bad:
-        raise ValueError(f"Valores inesperados em 'species': {sorted(bad)}")
+    csv_size = csv_path.stat().st_size  # antes da leitura: linhas anexadas depois ficam para o update.py
 
-    df["species"] = (
-        df["species"].replace(SPECIES_TO_INT).infer_objects(copy=False).astype("int64")
-    )
+    if args.stream:
+        clf, cols, evaluator, n_rows = train_streaming(
+            csv_path, args.chunksize, id_column=args.id_column, test_size=0.2, seed=42,
+            var_smoothing=var_smoothing,
+        )
+        split_info = {
+            "split_method": "hash(row_id)",
+            "shuffle": False,
+            "chunksize": args.chunksize,
+            "id_column": args.id_column,
+        }
+    else:
+        with span("csv_read") as sp:
+            # sem --float32 o parse já é float64 (sem arredondar para float32 e voltar)
+            feature_dtype = np.float32 if args.float32 else np.float64
+            df, cache_info = load_typed_csv(csv_path, cache_dir=args.cache_dir, use_cache=not args.no_cache,
+                                            dtype=feature_dtype)
+            sp.set(rows=len(df), cache=cache_info["cache"])
+        print(f"Dados: {len(df)} linhas (cache: {cache_info['cache']})")
+        n_rows = len(df)
 
-    cols = resolve_feature_columns(df)
-    X = df[cols].to_numpy(dtype=float)
-    y = df["species"].to_numpy(dtype=int)
+        with span("label_mapping"):
+            species_col = find_species_column(df.columns)
+            if species_col != "species":
+                df = df.rename(columns={species_col: "species"})
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, shuffle=True, random_state=42
-    )
+            df["species"] = encode_species(df["species"])
+
+        with span("resolve_feature_columns"):
+            cols = resolve_feature_columns(df)
+        with span("to_numpy"):
+            # com o cache tipado isto é uma view do memory-map (sem cópia)
+            X = df[cols].to_numpy(dtype=feature_dtype)
+            y = df["species"].to_numpy(dtype=int)
+
+        with span("split"):
+            if args.float32:
+                train_idx, test_idx = index_split(len(y), test_size=0.2, seed=42)
+                y_test = y[test_idx]
+            else:
+                X_train, X_test, y_train, y_test = train_test_split(
+                    X, y, test_size=0.2, shuffle=True, random_state=42
+                )
+
+        if args.cv:
+            if args.float32:
+                X_train, y_train = X[train_idx], y[train_idx]  # o K-fold precisa do treino materializado
+            t0 = time.perf_counter()
+            with span("cv", n_splits=args.cv, n_repeats=args.repeats, configs=len(grid)):
+                per_config, best = cross_validate_grid(
+                    X_train, y_train, grid, args.cv, args.repeats, jobs=args.jobs, seed=42
+                )
+            var_smoothing = best["var_smoothing"]
+            cv_info = {
+                "n_splits": args.cv,
+                "n_repeats": args.repeats,
+                "jobs": args.jobs,
+                "wall_seconds": time.perf_counter() - t0,
+                "best_var_smoothing": var_smoothing,
+                "configs": per_config,
+            }
+            print(f"CV {args.cv}x{args.repeats} ({len(grid)} configs) em {cv_info['wall_seconds']:.2f}s")
+            for c in per_config:
+                print(f"  var_smoothing={c['var_smoothing']:g}: "
+                      f"{c['mean_accuracy']:.4f} ± {c['std_accuracy']:.4f}")
+            print(f"Melhor var_smoothing: {var_smoothing:g}\n")
 
-    clf = GaussianNB()
-    clf.fit(X_train, y_train)
-    y_pred = clf.predict(X_test)
+        if args.float32:
+            with span("fit", rows=len(train_idx), dtype="float32"):
+                clf = fit_float32(X, y, train_idx, var_smoothing)
+            with span("predict_test", rows=len(test_idx)):
+                y_pred = predict_rows(clf, X, test_idx)
+        else:
+            with span("fit", rows=len(y_train)):
+                clf = GaussianNB(var_smoothing=var_smoothing)
+                clf.fit(X_train, y_train)
+            with span("predict_test", rows=len(y_test)):
+                y_pred = clf.predict(X_test)
+        split_info = {"split_method": "train_test_split", "shuffle": True,
+                      "feature_dtype": np.dtype(feature_dtype).name}
 
-    acc = float(accuracy_score(y_test, y_pred))
     labels_sorted = sorted(INT_TO_SPECIES.keys())  # [1,2,3]
     target_names = [INT_TO_SPECIES[i] for i in labels_sorted]
-    cls_report = classification_report(
-        y_test,
-        y_pred,
-        labels=labels_sorted,
-        target_names=target_names,
-        output_dict=True,
-    )
-    cm = confusion_matrix(y_test, y_pred, labels=labels_sorted)
+    with span("metrics"):
+        # uma matriz de confusão (um bincount) e todo o resto derivado dela
+        if not args.stream:
+            evaluator = ConfusionAccumulator(labels_sorted).update(y_test, y_pred)
+        cm = evaluator.cm
+        acc = evaluator.accuracy()
+        cls_report = evaluator.report(target_names)
 
     print(f"Accuracy: {acc:.4f}\n")
     print("Classification report:")
-    print(
-        classification_report(
-            y_test, y_pred, labels=labels_sorted, target_names=target_names
-        )
-    )
+    print(format_report(cls_report, target_names))
     print("Confusion matrix (rows=true, cols=pred):")
     print(cm)
 
-   
+
+    # cada arquivo é escrito num temporário e trocado com os.replace: quem lê
+    # (Streamlit, daemon, CLIs) nunca vê um artefato pela metade
     out_model = Path(args.model_out)
-    out_model.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(
-        {
-            "model": clf,
-            "feature_columns": cols,
-            "species_to_int": SPECIES_TO_INT,
-            "int_to_species": INT_TO_SPECIES,
-        },
-        out_model,
-    )
+    with span("write_model"), atomic_path(out_model) as tmp:
+        joblib.dump(
+            {
+                "model": clf,
+                "feature_columns": cols,
+                "species_to_int": SPECIES_TO_INT,
+                "int_to_species": INT_TO_SPECIES,
+                "version": 1,
+                "training_state": training_state(csv_path, csv_size, n_rows, split_info, var_smoothing),
+            },
+            tmp,
+        )
+    with span("write_compiled"), atomic_path(Path(args.compiled_out)) as tmp:
+        export_compiled(clf, cols, SPECIES_TO_INT, INT_TO_SPECIES, tmp)
 
     mapping_json = {
         "species_to_int": SPECIES_TO_INT,
@@ -123,11 +547,10 @@ def main():
         "label_column": "species",
         "label_mapping_method": "pandas.Series.replace",
     }
-    Path(args.mapping_out).write_text(
-        json.dumps(mapping_json, indent=2, ensure_ascii=False), encoding="utf-8"
-    )
+    with span("write_mapping"):
+        atomic_write_text(Path(args.mapping_out), json.dumps(mapping_json, indent=2, ensure_ascii=False))
+
 
-    
     metrics = {
         "accuracy": acc,
         "classification_report": cls_report,
@@ -136,19 +559,38 @@ def main():
         "target_names": target_names,
         "feature_columns": cols,
         "test_size": 0.2,
-        "shuffle": True,
+        "shuffle": split_info["shuffle"],
         "random_state": 42,
         "model": "GaussianNB",
+        "var_smoothing": var_smoothing,
         "label_mapping_method": "pandas.Series.replace",
+        **{k: v for k, v in split_info.items() if k != "shuffle"},
     }
-    Path(args.metrics_out).write_text(
-        json.dumps(metrics, indent=2, ensure_ascii=False), encoding="utf-8"
-    )
+    if cv_info:
+        metrics["cv"] = cv_info
+    with span("write_metrics"):
+        atomic_write_text(Path(args.metrics_out), json.dumps(metrics, indent=2, ensure_ascii=False))
+
+    version = None
+    if not args.no_registry:
+        with span("registry_publish"):
+            version = publish(
+                {
+                    MODEL_FILE: out_model,
+                    COMPILED_FILE: args.compiled_out,
+                    MAPPING_FILE: args.mapping_out,
+                    METRICS_FILE: args.metrics_out,
+                },
+                Path(args.registry),
+                info={"source": "train.py", "accuracy": acc},
+            )
 
     print(f"\nModelo salvo em: {out_model}")
+    print(f"Modelo compilado (NumPy) salvo em: {args.compiled_out}")
     print(f"Mapeamentos salvos em: {args.mapping_out}")
     print(f"Métricas salvas em: {args.metrics_out}")
-
+    if version:
+        print(f"Registro: versão {version} ativa em {args.registry}")
 
 if __name__ == "__main__":
     main()
@@ -6,6 +6,8 @@ from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 
+from evaluation import accuracy_from_confusion, report_from_confusion
+
 console = Console()
 
 def main():
@@ -15,17 +17,24 @@ def main():
 
     data = json.loads(metrics_path.read_text(encoding="utf-8"))
 
+    # tudo sai da matriz de confusão (o classification_report salvo fica de reserva)
+    cm = data.get("confusion_matrix", [])
+    labels = data.get("target_names", [])
+    if cm and labels:
+        cr = report_from_confusion(cm, labels)
+        accuracy = accuracy_from_confusion(cm)
+    else:
+        cr = data.get("classification_report", {})
+        accuracy = data.get("accuracy")
+
    
     top = Panel(f"[bold]Modelo:[/] {data.get('model')}\n"
-                f"[bold]Accuracy:[/] {data.get('accuracy'):.4f}\n"
+                f"[bold]Accuracy:[/] {accuracy:.4f}\n"
                 f"[bold]Split:[/] test_size={data.get('test_size')}  shuffle={data.get('shuffle')}  random_state={data.get('random_state')}\n"
                 f"[bold]Features:[/] {', '.join(data.get('feature_columns', []))}",
                 title="Resumo", border_style="green")
     console.print(top)
 
-    
-    cr = data.get("classification_report", {})
-    
     per_class = Table(title="Relatório por classe", show_lines=True)
     per_class.add_column("Classe", style="magenta")
     per_class.add_column("precision", justify="right")
@@ -54,9 +63,6 @@ def main():
                               f"{row.get('f1-score',0):.4f}")
             console.print(avg_table)
 
-    
-    cm = data.get("confusion_matrix", [])
-    labels = data.get("target_names", [])
     if cm and labels:
         cm_table = Table(title="Matriz de Confusão (rows=true, cols=pred)", show_lines=True)
         cm_table.add_column("")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# Atualização incremental do modelo: incorpora só as linhas anexadas ao CSV
+import argparse
+import io
+import json
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import GaussianNB
+
+from data_cache import tail_digest
+from evaluation import ConfusionAccumulator
+from nb_numpy import export_compiled
+from registry import (
+    COMPILED_FILE,
+    DEFAULT_REGISTRY,
+    LEGACY_MODEL,
+    MAPPING_FILE,
+    METRICS_FILE,
+    MODEL_FILE,
+    atomic_path,
+    atomic_write_text,
+    artifact_path,
+    default_model_path,
+    is_registry,
+    publish,
+    resolve_model_path,
+)
+from train import GaussianStats, hash_test_mask, iter_labeled_chunks, training_state
+from utils import INT_TO_SPECIES, encode_species, find_species_column, resolve_feature_columns
+
+
+def read_new_rows(csv_path: Path, state: dict):
+    """Lê só os bytes depois de state["bytes_seen"] (custo proporcional ao que é novo)."""
+    size = csv_path.stat().st_size
+    offset = state["bytes_seen"]
+    if size < offset or tail_digest(csv_path, offset) != state["tail_sha256"]:
+        raise ValueError(
+            "O CSV foi reescrito desde o último treino (não só recebeu linhas no fim). "
+            "Rode python src/train.py para um treino completo."
+        )
+    with csv_path.open("rb") as fh:
+        header = fh.readline()
+        fh.seek(offset)
+        new_bytes = fh.read(size - offset)
+    if not new_bytes.strip():
+        return None, size
+    return pd.read_csv(io.BytesIO(header + new_bytes)), size
+
+
+def incorporate(clf, X, y, var_smoothing):
+    """Junta linhas novas ao modelo sem o partial_fit.
+
+    As estatísticas cruas saem do modelo (var_ - epsilon_, exato para modelos do
+    fit()/GaussianStats), recebem as linhas novas e o epsilon é refeito uma vez
+    com a variância de todo o treino. O partial_fit misturaria o epsilon antigo
+    na variância acumulada.
+    """
+    return GaussianStats.from_model(clf).update(X, y).to_model(var_smoothing)
+
+
+def full_retrain_check(csv_path: Path, state: dict, rows_before: int, clf, chunksize=1_000_000):
+    """Treino completo equivalente (mesmas linhas de treino) para comparar com o incremental.
+
+    Linhas do treino original repetem o split dele; as anexadas depois usam o
+    hash do id. A tolerância cobre o float32 do loader tipado.
+    """
+    base_rows = state.get("base_rows", rows_before)
+    base_train = None
+    if state["split_method"] == "train_test_split":
+        train_idx, _ = train_test_split(
+            np.arange(base_rows), test_size=state["test_size"], shuffle=True,
+            random_state=state["random_state"],
+        )
+        base_train = np.zeros(base_rows, dtype=bool)
+        base_train[train_idx] = True
+
+    X_parts, y_parts = [], []
+    offset = 0
+    for _, X, y, row_ids in iter_labeled_chunks(csv_path, chunksize, state.get("id_column")):
+        pos = np.arange(offset, offset + len(y))
+        mask = ~hash_test_mask(row_ids, state["test_size"], state["random_state"])
+        if base_train is not None:
+            old = pos < base_rows
+            mask[old] = base_train[pos[old]]
+        X_parts.append(X[mask])
+        y_parts.append(y[mask])
+        offset += len(y)
+    ref = GaussianNB(var_smoothing=state["var_smoothing"]).fit(np.concatenate(X_parts), np.concatenate(y_parts))
+    return {
+        "max_abs_diff_theta": float(np.max(np.abs(ref.theta_ - clf.theta_))),
+        "max_abs_diff_var": float(np.max(np.abs(ref.var_ - clf.var_))),
+        "class_count_equal": bool(np.array_equal(ref.class_count_, clf.class_count_)),
+        "matches": bool(
+            np.allclose(ref.theta_, clf.theta_, rtol=1e-6, atol=1e-6)
+            and np.allclose(ref.var_, clf.var_, rtol=1e-6, atol=1e-6)
+            and np.array_equal(ref.class_count_, clf.class_count_)
+        ),
+    }
+
+
+def main():
+    root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Atualiza o GaussianNB com as linhas novas do CSV (estatísticas incrementais, sem retreino completo)."
+    )
+    parser.add_argument("--model", default=None,
+                        help="Bundle .joblib existente ou diretório do registro (padrão: models/registry se "
+                             "existir, senão models/iris_nb.joblib). Do registro parte-se da versão ativa e o "
+                             "resultado é gravado em models/iris_nb.joblib e publicado.")
+    parser.add_argument("--csv", default=None,
+                        help="CSV com as linhas anexadas (padrão: o mesmo usado no treino).")
+    parser.add_argument("--metrics-out", default=str(root / "models" / "metrics.json"),
+                        help="Arquivo JSON de métricas a atualizar.")
+    parser.add_argument("--registry", default=None,
+                        help="Registro versionado onde a nova versão é publicada "
+                             "(padrão: o do --model, se for um registro, senão models/registry).")
+    parser.add_argument("--no-registry", action="store_true",
+                        help="Só regrava os arquivos avulsos, sem publicar no registro.")
+    parser.add_argument("--check", action="store_true",
+                        help="Compara com um treino completo sobre as mesmas linhas (lê o CSV inteiro).")
+    args = parser.parse_args()
+
+    source = Path(args.model) if args.model else default_model_path()
+    from_registry = is_registry(source)
+    source_model = resolve_model_path(source)
+    if not source_model.exists():
+        raise FileNotFoundError(f"Modelo não encontrado: {source_model}. Rode antes: python src/train.py")
+    # a versão no registro é imutável (diretório por hash): o resultado vai para os arquivos avulsos
+    model_path = LEGACY_MODEL if from_registry else source_model
+    registry_dir = Path(args.registry) if args.registry else (source if from_registry else DEFAULT_REGISTRY)
+    bundle = joblib.load(source_model)
+    state = bundle.get("training_state")
+    if not state:
+        raise ValueError("Bundle sem training_state (treinado por versão antiga). Rode python src/train.py.")
+    clf = bundle["model"]
+    csv_path = Path(args.csv or state["csv"])
+
+    t0 = time.perf_counter()
+    df, new_size = read_new_rows(csv_path, state)
+    if df is None or df.empty:
+        print("Nenhuma linha nova no CSV; modelo inalterado.")
+        return
+
+    species_col = find_species_column(df.columns)
+    cols = resolve_feature_columns(df)
+    if list(cols) != list(bundle["feature_columns"]):
+        raise ValueError(f"Colunas diferentes das do modelo: {cols} != {bundle['feature_columns']}")
+    y = encode_species(df[species_col]).to_numpy(dtype=int)
+    X = df[cols].to_numpy(dtype=float)
+    rows_before = state["rows_seen"]
+    if state.get("id_column"):
+        row_ids = df[state["id_column"]].to_numpy()
+    else:
+        row_ids = np.arange(rows_before, rows_before + len(df), dtype=np.int64)
+
+    unknown = np.setdiff1d(np.unique(y), clf.classes_)
+    if unknown.size:
+        raise ValueError(
+            f"Classes ausentes no treino original: {unknown.tolist()}. Rode python src/train.py "
+            "(a atualização incremental não aceita classes novas)."
+        )
+
+    # linhas novas seguem o split por hash do id (reprodutível, sem olhar o resto do arquivo)
+    test_mask = hash_test_mask(row_ids, state["test_size"], state["random_state"])
+    if (~test_mask).any():
+        clf = incorporate(clf, X[~test_mask], y[~test_mask], state["var_smoothing"])
+    update_seconds = time.perf_counter() - t0
+
+    update_info = {
+        "new_rows": int(len(df)),
+        "new_train_rows": int((~test_mask).sum()),
+        "new_test_rows": int(test_mask.sum()),
+        "seconds": update_seconds,
+    }
+    if test_mask.any():
+        evaluator = ConfusionAccumulator(sorted(INT_TO_SPECIES.keys()))
+        evaluator.update(y[test_mask], clf.predict(X[test_mask]))
+        update_info["accuracy_new_holdout"] = evaluator.accuracy()
+        update_info["confusion_matrix_new_holdout"] = evaluator.cm.tolist()
+
+    if args.check:
+        update_info["full_retrain_check"] = full_retrain_check(csv_path, state, rows_before, clf)
+
+    version = int(bundle.get("version", 1)) + 1
+    split_info = {"split_method": state["split_method"], "id_column": state.get("id_column")}
+    new_state = training_state(csv_path, new_size, rows_before + len(df), split_info, state["var_smoothing"])
+    # as linhas originais continuam com o split do treino completo; as novas, por hash
+    new_state["split_method"] = state["split_method"]
+    new_state["rows_seen"] = rows_before + len(df)
+    new_state["base_rows"] = state.get("base_rows", rows_before)
+    new_bundle = {**bundle, "model": clf, "version": version, "training_state": new_state}
+
+    compiled_path = model_path.with_suffix(".npz")
+    with atomic_path(model_path) as tmp:
+        joblib.dump(new_bundle, tmp)
+    with atomic_path(compiled_path) as tmp:
+        export_compiled(clf, bundle["feature_columns"], bundle["species_to_int"], bundle["int_to_species"], tmp)
+
+    metrics_path = Path(args.metrics_out)
+    metrics_src = artifact_path(source, METRICS_FILE) if from_registry else metrics_path
+    metrics = json.loads(metrics_src.read_text(encoding="utf-8")) if metrics_src.exists() else {}
+    metrics["model_version"] = version
+    metrics.setdefault("updates", []).append({"version": version, **update_info})
+    metrics["update"] = {"version": version, **update_info}
+    atomic_write_text(metrics_path, json.dumps(metrics, indent=2, ensure_ascii=False))
+
+    registry_version = None
+    if not args.no_registry:
+        files = {MODEL_FILE: model_path, COMPILED_FILE: compiled_path, METRICS_FILE: metrics_path}
+        mapping_path = artifact_path(source, MAPPING_FILE)
+        if mapping_path.exists():
+            files[MAPPING_FILE] = mapping_path
+        registry_version = publish(files, registry_dir,
+                                   info={"source": "update.py", "model_version": version})
+
+    print(f"{len(df)} linhas novas incorporadas em {update_seconds:.3f}s "
+          f"({update_info['new_train_rows']} treino / {update_info['new_test_rows']} teste)")
+    if "accuracy_new_holdout" in update_info:
+        print(f"Accuracy nas linhas novas de teste: {update_info['accuracy_new_holdout']:.4f}")
+    if args.check:
+        chk = update_info["full_retrain_check"]
+        print(f"Treino completo equivalente: {'OK' if chk['matches'] else 'DIVERGENTE'} "
+              f"(max |Δtheta|={chk['max_abs_diff_theta']:.2e}, max |Δvar|={chk['max_abs_diff_var']:.2e})")
+    print(f"Modelo v{version} salvo em: {model_path}")
+    if registry_version:
+        print(f"Registro: versão {registry_version} ativa em {registry_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,39 @@ def normalize_species_name(s: str) -> str:
     s = s.replace("iris-", "").replace("iris ", "").replace("iris_", "")
     return s
 
+LABEL_COLUMN_ALIASES = ("species", "target", "class", "variety", "label")
+
+def find_species_column(columns) -> str:
+    """Nome da coluna de rótulo no CSV (species ou um alias conhecido)."""
+    if "species" in columns:
+        return "species"
+    for c in columns:
+        if str(c).lower().strip() in LABEL_COLUMN_ALIASES:
+            return c
+    raise KeyError("Coluna 'species' não encontrada no CSV.")
+
+def encode_species(series):
+    """Normaliza os nomes e mapeia para 1/2/3 com Series.replace (int64).
+
+    normalize_species_name e o Series.replace rodam só sobre os valores
+    distintos (categorias); as linhas recebem o resultado pelos códigos
+    categóricos, sem laço Python por linha.
+    """
+    import pandas as pd  # adiado: utils é importado pela CLI de predição
+
+    cat = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+    codes = cat.cat.codes.to_numpy()
+    levels = cat.cat.categories.to_series(index=None).map(normalize_species_name)
+
+    bad = set(levels.unique()) - set(SPECIES_TO_INT.keys())
+    if (codes < 0).any():
+        bad.add(normalize_species_name(float("nan")))  # mesmo texto ("nan") da versão por linha
+    if bad:
+        raise ValueError(f"Valores inesperados em 'species': {sorted(bad)}")
+
+    level_ints = levels.replace(SPECIES_TO_INT).infer_objects(copy=False).astype("int64").to_numpy()
+    return pd.Series(level_ints[codes], index=series.index, name=series.name, dtype="int64")
+
 def _norm_key(c: str) -> str:
     c = str(c).lower()
     return "".join(ch for ch in c if ch.isalnum())
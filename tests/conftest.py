@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+IRIS_CSV = ROOT / "data" / "iris.csv"
+
+
+@pytest.fixture
+def iris_csv():
+    return IRIS_CSV
+
+
+@pytest.fixture(scope="session")
+def iris_model():
+    """GaussianNB treinado no iris.csv inteiro (rótulos 1/2/3) e a matriz de features."""
+    import pandas as pd
+    from sklearn.naive_bayes import GaussianNB
+
+    from utils import encode_species, find_species_column, resolve_feature_columns
+
+    df = pd.read_csv(IRIS_CSV)
+    cols = resolve_feature_columns(df)
+    X = df[cols].to_numpy(dtype=float)
+    y = encode_species(df[find_species_column(df.columns)]).to_numpy(dtype=int)
+    return GaussianNB().fit(X, y), X
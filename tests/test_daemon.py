@@ -0,0 +1,45 @@
+import os
+import threading
+import time
+
+import pytest
+
+import predict_daemon
+from registry import default_model_path
+
+pytestmark = pytest.mark.skipif(not predict_daemon.unix_sockets_supported(), reason="sem AF_UNIX")
+
+
+@pytest.fixture
+def daemon_socket(tmp_path):
+    if not default_model_path().exists():
+        pytest.skip("modelo não treinado (rode python src/train.py)")
+    socket_path = tmp_path / "run" / "daemon.sock"
+    threading.Thread(target=predict_daemon.serve, args=(default_model_path(), socket_path), daemon=True).start()
+    for _ in range(100):
+        if predict_daemon.ping(socket_path):
+            return socket_path
+        time.sleep(0.05)
+    pytest.fail("daemon não subiu")
+
+
+def test_socket_dir_and_socket_are_private(daemon_socket):
+    assert daemon_socket.parent.stat().st_mode & 0o777 == 0o700
+    assert daemon_socket.stat().st_mode & 0o777 == 0o600
+
+
+def test_predict_through_socket(daemon_socket):
+    resp = predict_daemon.request(daemon_socket, {"op": "predict", "values": [5.1, 3.5, 1.4, 0.2]})
+    assert resp["ok"] and resp["pred_species"] == "setosa"
+
+
+def test_refuses_socket_of_another_user(daemon_socket, monkeypatch):
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(daemon_socket).st_uid + 1)
+    assert predict_daemon.request(daemon_socket, {"op": "ping"}) is None
+
+
+def test_default_socket_prefers_xdg_runtime_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert predict_daemon.default_socket_path().parent == tmp_path
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert predict_daemon.default_socket_path().parent.name.startswith("iris_nb-")
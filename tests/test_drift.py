@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+
+from drift import DriftMonitor
+from registry import model_token
+
+INT_TO_SPECIES = {1: "setosa", 2: "versicolor", 3: "virginica"}
+COLS = ["sepal_length_cm", "sepal_width_cm", "petal_length_cm", "petal_width_cm"]
+
+
+def test_training_like_data_has_no_drift(iris_model, tmp_path):
+    clf, X = iris_model
+    monitor = DriftMonitor(tmp_path / "drift.json")
+    monitor.bind("v1", clf, COLS, INT_TO_SPECIES)
+    monitor.update(X, clf.predict(X))
+    assert not monitor.snapshot()["drift"]
+
+
+def test_shifted_data_is_flagged(iris_model, tmp_path):
+    clf, X = iris_model
+    monitor = DriftMonitor(tmp_path / "drift.json")
+    monitor.bind("v1", clf, COLS, INT_TO_SPECIES)
+    shifted = X + np.array([0.0, 0.0, 1.5, 0.0])
+    monitor.update(shifted, clf.predict(X))
+    summary = monitor.snapshot()
+    assert summary["drift"] and summary["features"]["petal_length_cm"]["drift"]
+
+
+
+def test_non_finite_rows_are_rejected(iris_model, tmp_path):
+    clf, X = iris_model
+    clean = DriftMonitor(tmp_path / "clean.json")
+    clean.bind("v1", clf, COLS, INT_TO_SPECIES)
+    clean.update(X, clf.predict(X))
+    monitor = DriftMonitor(tmp_path / "drift.json")
+    monitor.bind("v1", clf, COLS, INT_TO_SPECIES)
+    bad = X[:3].copy()
+    bad[0, 1], bad[1, 2], bad[2, 0] = np.nan, np.inf, -np.inf
+    monitor.update(np.vstack([X, bad]), np.concatenate([clf.predict(X), [1, 2, 3]]))
+    summary, ref = monitor.snapshot(), clean.snapshot()
+    assert summary["rows"] == len(X) and summary["rejected_rows"] == 3
+    assert summary["features"] == ref["features"] and not summary["drift"]
+
+def test_summary_identifies_registry_version(iris_model, tmp_path):
+    clf, X = iris_model
+    reg = tmp_path / "registry"
+    reg.mkdir()
+    (reg / "manifest.json").write_text(json.dumps({"active": "abc123", "history": []}), encoding="utf-8")
+    path = tmp_path / "drift.json"
+    monitor = DriftMonitor(path)
+    monitor.bind(model_token(reg), clf, COLS, INT_TO_SPECIES)
+    monitor.update(X[:10], clf.predict(X[:10]))
+    monitor.flush()
+    summary = json.loads(path.read_text(encoding="utf-8"))
+    assert summary["model_version"] == "abc123"
+    assert summary["model_path"] == str(reg.resolve())
+
+
+def test_summary_identifies_loose_model_by_mtime(iris_model, tmp_path):
+    clf, _ = iris_model
+    model = tmp_path / "iris_nb.joblib"
+    model.write_bytes(b"x")
+    monitor = DriftMonitor(None)
+    monitor.bind(model_token(model), clf, COLS, INT_TO_SPECIES)
+    monitor.update(np.zeros((1, 4)), clf.classes_[:1])
+    summary = monitor.snapshot()
+    assert summary["model_mtime_ns"] == model.stat().st_mtime_ns
+    assert summary["compiled_mtime_ns"] is None
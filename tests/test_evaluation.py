@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.metrics import confusion_matrix as sk_confusion_matrix
+
+from evaluation import ConfusionAccumulator, confusion_matrix, format_report, report_from_confusion
+
+LABELS = [1, 2, 3]
+NAMES = ["setosa", "versicolor", "virginica"]
+
+
+def _random_labels(seed, n=500):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(1, 4, n)
+    y_pred = np.where(rng.random(n) < 0.7, y_true, rng.integers(1, 4, n))
+    return y_true, y_pred
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_sklearn(seed):
+    y_true, y_pred = _random_labels(seed)
+    cm = confusion_matrix(y_true, y_pred, LABELS)
+    np.testing.assert_array_equal(cm, sk_confusion_matrix(y_true, y_pred, labels=LABELS))
+    ev = ConfusionAccumulator(LABELS).update(y_true, y_pred)
+    assert ev.accuracy() == accuracy_score(y_true, y_pred)
+    expected = classification_report(y_true, y_pred, labels=LABELS, target_names=NAMES, output_dict=True)
+    report = ev.report(NAMES)
+    assert report.keys() == expected.keys()
+    for key, value in expected.items():
+        assert report[key] == pytest.approx(value)
+
+
+def test_text_report_is_identical_to_sklearn():
+    # setosa: tp=1, support=5, predicted=11 → F1 = 0.125; 2·p·r/(p+r) dá 0.12500000000000003 (0.13)
+    cm = np.array([[1, 4, 0], [10, 2, 0], [0, 0, 8]])
+    y_true = np.repeat(np.repeat(LABELS, 3), cm.ravel())
+    y_pred = np.repeat(np.tile(LABELS, 3), cm.ravel())
+    expected = classification_report(y_true, y_pred, labels=LABELS, target_names=NAMES)
+    assert format_report(report_from_confusion(cm, NAMES), NAMES) == expected
+
+
+def test_streaming_accumulation_equals_single_pass():
+    y_true, y_pred = _random_labels(0, n=1_000)
+    acc = ConfusionAccumulator(LABELS)
+    for start in range(0, len(y_true), 128):
+        acc.update(y_true[start:start + 128], y_pred[start:start + 128])
+    np.testing.assert_array_equal(acc.cm, confusion_matrix(y_true, y_pred, LABELS))
+
+
+def test_class_without_samples_scores_zero():
+    report = report_from_confusion(np.array([[5, 0, 0], [0, 0, 0], [0, 0, 5]]), NAMES)
+    assert report["versicolor"] == {"precision": 0.0, "recall": 0.0, "f1-score": 0.0, "support": 0.0}
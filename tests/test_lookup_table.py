@@ -0,0 +1,54 @@
+import joblib
+import numpy as np
+
+from lookup_table import export_lookup, load_lookup, model_fingerprint
+from nb_numpy import export_compiled, load_compiled
+from scoring import load_model
+
+COLS = ["sepal_length_cm", "sepal_width_cm", "petal_length_cm", "petal_width_cm"]
+SPECIES_TO_INT = {"setosa": 1, "versicolor": 2, "virginica": 3}
+INT_TO_SPECIES = {v: k for k, v in SPECIES_TO_INT.items()}
+
+
+def _save_model(clf, tmp_path):
+    model_path = tmp_path / "iris_nb.joblib"
+    joblib.dump({"model": clf, "feature_columns": COLS, "species_to_int": SPECIES_TO_INT,
+                 "int_to_species": INT_TO_SPECIES}, model_path)
+    export_compiled(clf, COLS, SPECIES_TO_INT, INT_TO_SPECIES, model_path.with_suffix(".npz"))
+    return model_path
+
+
+def _export(clf, X, tmp_path, source):
+    return export_lookup(clf, COLS, SPECIES_TO_INT, INT_TO_SPECIES, X.min(axis=0), X.max(axis=0),
+                         tmp_path / "iris_nb.lut.npz", source_model=source)
+
+
+def test_tables_match_sklearn(iris_model, tmp_path):
+    clf, X = iris_model
+    lut, cols, _, _ = load_model(_export(clf, X, tmp_path, None))
+    assert cols == COLS
+    np.testing.assert_allclose(lut.predict_proba(X), clf.predict_proba(X), atol=1e-12)
+    # fora da grade: cai no cálculo exato
+    off = X + 0.037
+    np.testing.assert_allclose(lut.predict_proba(off), clf.predict_proba(off), atol=1e-12)
+
+
+def test_fingerprint_same_for_joblib_and_compiled(iris_model, tmp_path):
+    clf, _ = iris_model
+    compiled, _, _, _ = load_compiled(export_compiled(clf, COLS, SPECIES_TO_INT, INT_TO_SPECIES, tmp_path / "m.npz"))
+    assert model_fingerprint(compiled) == model_fingerprint(clf)
+
+
+def test_stale_tables_fall_back_to_current_model(iris_model, tmp_path, capsys):
+    clf, X = iris_model
+    model_path = _save_model(clf, tmp_path)
+    lut_path = _export(clf, X, tmp_path, model_path)
+    assert type(load_lookup(lut_path)[0]).__name__ == "LookupNB"
+
+    # "retreino": o modelo de origem muda depois da exportação
+    retrained = type(clf)(var_smoothing=1e-2).fit(X, clf.predict(X))
+    _save_model(retrained, tmp_path)
+    model, *_ = load_model(lut_path)
+    assert type(model).__name__ != "LookupNB"
+    np.testing.assert_allclose(model.predict_proba(X), retrained.predict_proba(X), atol=1e-12)
+    assert "outra versão" in capsys.readouterr().err
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from nb_numpy import export_compiled
+from parallel_score import score_parallel
+
+INT_TO_SPECIES = {1: "setosa", 2: "versicolor", 3: "virginica"}
+COLS = ["sepal_length_cm", "sepal_width_cm", "petal_length_cm", "petal_width_cm"]
+
+
+def _model(clf, tmp_path):
+    return export_compiled(clf, COLS, {v: k for k, v in INT_TO_SPECIES.items()}, INT_TO_SPECIES,
+                           tmp_path / "m.npz")
+
+
+def test_multi_chunk_shards_keep_every_row(iris_model, iris_csv, tmp_path):
+    clf, X = iris_model
+    out = tmp_path / "preds.csv"
+    stats = score_parallel(iris_csv, out, _model(clf, tmp_path), workers=2, chunksize=7)
+    preds = pd.read_csv(out)
+    assert stats["rows"] == len(preds) == len(X)
+    np.testing.assert_array_equal(preds["pred_label"], clf.predict(X))
+
+
+def test_header_only_input_writes_header(iris_model, iris_csv, tmp_path):
+    clf, _ = iris_model
+    src = tmp_path / "empty.csv"
+    src.write_text(iris_csv.read_text().splitlines()[0] + "\n")
+    out = tmp_path / "preds.csv"
+    stats = score_parallel(src, out, _model(clf, tmp_path), workers=1)
+    preds = pd.read_csv(out)
+    assert stats["rows"] == 0 and len(preds) == 0
+    assert list(preds.columns[-5:]) == ["pred_label", "pred_species", "prob_setosa", "prob_versicolor",
+                                        "prob_virginica"]
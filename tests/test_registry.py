@@ -0,0 +1,54 @@
+import json
+import threading
+
+import registry
+from registry import COMPILED_FILE, METRICS_FILE, MODEL_FILE, publish, read_manifest
+
+
+def _artifacts(tmp_path, model=b"modelo", accuracy=0.9):
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    files = {}
+    for name, data in ((MODEL_FILE, model), (COMPILED_FILE, model + b"-npz")):
+        path = tmp_path / f"src-{name}"
+        path.write_bytes(data)
+        files[name] = path
+    metrics = tmp_path / "src-metrics.json"
+    metrics.write_text(json.dumps({"accuracy": accuracy}), encoding="utf-8")
+    files[METRICS_FILE] = metrics
+    return files
+
+
+def test_publish_same_content_refreshes_metrics(tmp_path):
+    reg = tmp_path / "registry"
+    v1 = publish(_artifacts(tmp_path, accuracy=0.9), reg)
+    v2 = publish(_artifacts(tmp_path, accuracy=0.95), reg)
+    assert v1 == v2
+    metrics = json.loads((reg / "versions" / v1 / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["accuracy"] == 0.95
+
+
+def test_concurrent_promotions_keep_every_history_entry(tmp_path):
+    reg = tmp_path / "registry"
+    versions = [publish(_artifacts(tmp_path / str(i), model=bytes([i])), reg, promote_now=False)
+                for i in range(2)]
+    n_threads, per_thread = 8, 25
+
+    def worker(i):
+        for j in range(per_thread):
+            registry.promote(reg, versions[(i + j) % 2], {"worker": i})
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(read_manifest(reg)["history"]) == n_threads * per_thread
+
+
+def test_rollback_returns_to_previous_version(tmp_path):
+    reg = tmp_path / "registry"
+    v1 = publish(_artifacts(tmp_path / "a", model=b"a"), reg)
+    v2 = publish(_artifacts(tmp_path / "b", model=b"b"), reg)
+    assert registry.active_version(reg) == v2
+    assert registry.rollback(reg) == v1
+    assert registry.active_version(reg) == v1
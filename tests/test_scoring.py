@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from nb_numpy import export_compiled, load_compiled
+from pred_cache import PredictionCache
+from scoring import check_finite, score_batch, values_from_mapping
+
+
+def test_score_batch_matches_sklearn(iris_model):
+    clf, X = iris_model
+    labels, proba = score_batch(clf, X)
+    np.testing.assert_array_equal(labels, clf.predict(X))
+    np.testing.assert_allclose(proba, clf.predict_proba(X))
+
+
+def test_compiled_model_matches_sklearn(iris_model, tmp_path):
+    clf, X = iris_model
+    path = export_compiled(clf, ["a", "b", "c", "d"], {"setosa": 1}, {1: "setosa"}, tmp_path / "m.npz")
+    compiled, cols, _, int_to_species = load_compiled(path)
+    assert cols == ["a", "b", "c", "d"] and int_to_species == {1: "setosa"}
+    np.testing.assert_array_equal(compiled.predict(X), clf.predict(X))
+    np.testing.assert_allclose(compiled.predict_proba(X), clf.predict_proba(X), atol=1e-12)
+
+
+def test_cache_miss_scores_original_row(iris_model):
+    clf, X = iris_model
+    # fora da grade de 0.1 cm: arredondar mudaria a probabilidade
+    row = X[60:61] + 0.04
+    _, proba = score_batch(clf, row, cache=PredictionCache(100, decimals=1))
+    np.testing.assert_array_equal(proba, clf.predict_proba(row))
+
+
+def test_cache_hits_and_dedup_keep_results(iris_model):
+    clf, X = iris_model
+    cache = PredictionCache(1_000, decimals=1)
+    batch = np.concatenate([X, X[::-1]])
+    labels, proba = score_batch(clf, batch, cache=cache)
+    np.testing.assert_array_equal(labels, clf.predict(batch))
+    np.testing.assert_allclose(proba, clf.predict_proba(batch))
+    first = cache.stats()
+    assert first["rows_deduplicated"] >= len(X)
+
+    labels2, proba2 = score_batch(clf, X, cache=cache)
+    np.testing.assert_array_equal(labels2, labels[:len(X)])
+    stats = cache.stats()
+    assert stats["misses"] == first["misses"]
+    assert stats["hits"] > first["hits"]
+
+
+def test_cache_bind_clears_on_new_model(iris_model):
+    clf, X = iris_model
+    cache = PredictionCache(1_000)
+    cache.bind("v1")
+    score_batch(clf, X[:10], cache=cache)
+    assert cache.stats()["size"] > 0
+    cache.bind("v2")
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_handles_empty_batch(iris_model):
+    clf, X = iris_model
+    labels, proba = score_batch(clf, X[:0], cache=PredictionCache(100))
+    assert labels.shape == (0,) and proba.shape == (0, 3)
+    assert labels.dtype == clf.classes_.dtype
+
+
+def test_check_finite_rejects_nan_and_inf():
+    cols = ["a", "b"]
+    X = np.array([values_from_mapping(r, cols) for r in ({"a": "1,5", "b": 2}, {"a": "nan", "b": 1}, {"a": 1, "b": "inf"})])
+    with pytest.raises(ValueError, match=r"2 linha\(s\): \[1, 2\]"):
+        check_finite(X)
+    np.testing.assert_array_equal(check_finite(X[:1]), [[1.5, 2.0]])
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.naive_bayes import GaussianNB
+
+from train import fit_float32, hash_test_mask, train_streaming
+from utils import encode_species, find_species_column
+
+
+def test_hash_mask_is_deterministic():
+    ids = np.arange(10_000, dtype=np.int64)
+    assert np.array_equal(hash_test_mask(ids, seed=7), hash_test_mask(ids, seed=7))
+
+
+def test_hash_mask_depends_on_seed():
+    ids = np.arange(10_000, dtype=np.int64)
+    a = hash_test_mask(ids, seed=42)
+    b = hash_test_mask(ids, seed=43)
+    assert not np.array_equal(a, b)
+
+
+def test_hash_mask_fraction():
+    ids = np.arange(100_000, dtype=np.int64)
+    assert abs(hash_test_mask(ids, test_size=0.2).mean() - 0.2) < 0.01
+
+
+def test_hash_mask_does_not_depend_on_chunking():
+    ids = np.arange(1_000, dtype=np.int64)
+    whole = hash_test_mask(ids)
+    parts = np.concatenate([hash_test_mask(ids[:337]), hash_test_mask(ids[337:])])
+    assert np.array_equal(whole, parts)
+
+
+@pytest.mark.parametrize("var_smoothing", [1e-9, 1e-2, 1e-1])
+def test_streaming_matches_full_fit(iris_csv, tmp_path, var_smoothing):
+    # embaralhado para que os chunks pequenos não tenham uma classe só
+    df = pd.read_csv(iris_csv).sample(frac=1.0, random_state=0)
+    csv = tmp_path / "iris.csv"
+    df.to_csv(csv, index=False)
+
+    clf, cols, _, n_rows = train_streaming(csv, chunksize=16, var_smoothing=var_smoothing)
+    assert n_rows == len(df)
+
+    train = ~hash_test_mask(np.arange(len(df), dtype=np.int64))
+    y = encode_species(df[find_species_column(df.columns)]).to_numpy(dtype=int)
+    ref = GaussianNB(var_smoothing=var_smoothing).fit(df[cols].to_numpy(dtype=float)[train], y[train])
+    _assert_same_model(clf, ref)
+
+
+@pytest.mark.parametrize("var_smoothing", [1e-9, 1e-1])
+def test_float32_chunks_match_full_fit(iris_model, var_smoothing):
+    _, X = iris_model
+    y = np.repeat([1, 2, 3], 50)
+    rng = np.random.default_rng(0)
+    train_idx = np.sort(rng.choice(len(y), 120, replace=False))
+    X32 = X.astype(np.float32)
+    clf = fit_float32(X32, y, train_idx, var_smoothing, chunk_rows=7)
+    ref = GaussianNB(var_smoothing=var_smoothing).fit(X32[train_idx].astype(np.float64), y[train_idx])
+    _assert_same_model(clf, ref)
+    np.testing.assert_array_equal(clf.predict(X), ref.predict(X))
+
+
+def _assert_same_model(clf, ref):
+    # acumulação em blocos difere do fit() de uma vez só no arredondamento
+    np.testing.assert_array_equal(clf.class_count_, ref.class_count_)
+    np.testing.assert_allclose(clf.class_prior_, ref.class_prior_, rtol=1e-12)
+    np.testing.assert_allclose(clf.theta_, ref.theta_, rtol=1e-12)
+    np.testing.assert_allclose(clf.var_, ref.var_, rtol=1e-9)
+    np.testing.assert_allclose(clf.epsilon_, ref.epsilon_, rtol=1e-9)
@@ -0,0 +1,54 @@
+import io
+import json
+from types import SimpleNamespace
+
+from stream_predict import StreamScorer
+
+INT_TO_SPECIES = {1: "setosa", 2: "versicolor", 3: "virginica"}
+COLS = ["sepal_length_cm", "sepal_width_cm", "petal_length_cm", "petal_width_cm"]
+
+
+def _run(clf, lines):
+    holder = SimpleNamespace(get=lambda: (clf, COLS, None, INT_TO_SPECIES), cache=None, monitor=None)
+    out = io.BytesIO()
+    scorer = StreamScorer(holder, out, show_probs=False)
+    scorer.process([(i + 1, line.encode("utf-8")) for i, line in enumerate(lines)])
+    return [json.loads(r) for r in out.getvalue().decode("utf-8").splitlines()], scorer.stats
+
+
+def test_garbage_first_line_does_not_break_csv(iris_model):
+    clf, _ = iris_model
+    records, _ = _run(clf, ["lixo,qualquer", "5.1,3.5,1.4,0.2", "6.7,3.0,5.2,2.3"])
+    assert [r["ok"] for r in records] == [False, True, True]
+    assert [r["pred_species"] for r in records[1:]] == ["setosa", "virginica"]
+
+
+def test_header_after_garbage_line_is_used(iris_model):
+    clf, _ = iris_model
+    records, _ = _run(clf, ["lixo", "petal.width,petal.length,sepal.width,sepal.length", "0.2,1.4,3.5,5.1"])
+    assert [r["ok"] for r in records] == [False, True]
+    assert records[1]["line"] == 3 and records[1]["pred_species"] == "setosa"
+
+
+def test_non_finite_values_are_rejected_per_line(iris_model):
+    clf, _ = iris_model
+    records, stats = _run(clf, ["5.1,nan,1.4,0.2", '{"sepal_length_cm": "inf", "sepal_width_cm": 3, '
+                                '"petal_length_cm": 1, "petal_width_cm": 1}', "5.1,3.5,1.4,0.2"])
+    assert [r["ok"] for r in records] == [False, False, True]
+    assert "não finitos" in records[0]["error"]
+    assert stats.rows == 1 and stats.errors == 2
+
+
+def test_failed_batch_becomes_error_records(iris_model):
+    clf, _ = iris_model
+
+    class Broken:
+        classes_ = clf.classes_
+
+        def predict_proba(self, X):
+            raise RuntimeError("modelo quebrado")
+
+    records, stats = _run(Broken(), ["5.1,3.5,1.4,0.2", "lixo,1,2,3"])
+    assert [(r["ok"], r["line"]) for r in records] == [(False, 1), (False, 2)]
+    assert records[0]["error"] == "modelo quebrado" and records[0]["type"] == "RuntimeError"
+    assert stats.rows == 0 and stats.errors == 2
@@ -0,0 +1,37 @@
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+import train
+import update
+
+
+def _run(module, monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", [module.__name__, *argv])
+    module.main()
+
+
+@pytest.mark.parametrize("split", ["memory", "stream"])
+@pytest.mark.parametrize("var_smoothing", ["1e-9", "0.1"])
+def test_update_matches_full_retrain(iris_csv, tmp_path, monkeypatch, split, var_smoothing):
+    df = pd.read_csv(iris_csv).sample(frac=1.0, random_state=1)
+    csv = tmp_path / "iris.csv"
+    df.iloc[:100].to_csv(csv, index=False)
+    model = tmp_path / "iris_nb.joblib"
+    metrics = tmp_path / "metrics.json"
+    args = ["--csv", str(csv), "--model-out", str(model), "--compiled-out", str(tmp_path / "iris_nb.npz"),
+            "--mapping-out", str(tmp_path / "species_mapping.json"), "--metrics-out", str(metrics),
+            "--no-registry", "--no-cache", "--var-smoothing", var_smoothing]
+    if split == "stream":
+        args += ["--stream", "--chunksize", "32"]
+    _run(train, monkeypatch, *args)
+
+    with csv.open("a", encoding="utf-8", newline="") as fh:
+        df.iloc[100:].to_csv(fh, index=False, header=False)
+    _run(update, monkeypatch, "--model", str(model), "--metrics-out", str(metrics), "--no-registry", "--check")
+
+    check = json.loads(metrics.read_text(encoding="utf-8"))["update"]["full_retrain_check"]
+    assert check["matches"], check
+    assert check["max_abs_diff_var"] < 1e-9